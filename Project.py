@@ -1,6 +1,24 @@
 import arcade
+import argparse
+import array
+import bisect
+import collections
+import concurrent.futures
+import hashlib
+import json
 import math
+import os
+import pyglet
 import random
+import struct
+import time
+import zlib
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 WORLD_WIDTH = 5000
 WORLD_HEIGHT = 5000
@@ -31,26 +49,295 @@ POISON_DAMAGE_PER_SECOND = 10
 POISON_TICK_INTERVAL = 1.0
 ORC_BOSS_MAX_HP = 3000
 ORC_BOSS_SPEED = 1
+ENEMY_MAX_SPEED = 3.2
+LIGHTNING_BAND_MARGIN = 1.0
 ORC_BOSS_DAMAGE = 35
 ORC_BOSS_ATTACK_COOLDOWN = 2.0
 ORC_BOSS_ATTACK_RANGE = 150
 ORC_BOSS_STOP_DISTANCE = 200
+COLLISION_CELL_SIZE = 96
+MAX_ALIVE_PROJECTILES = 800
+POOL_MAX_FREE = 1024
+SPAWN_PER_TICK = 16
+SPAWN_MARGIN = 60
+SPAWN_EXCLUSION = 1.2
+BROADPHASE_MIN_PAIRS = 1024
+ORB_MERGE_CELL = 64
+ORB_MAGNET_RADIUS = 150
+ORB_MAGNET_SPEED = 10.0
+ORB_PICKUP_RADIUS = 20
+MAX_EXP_ORBS = 400
+AI_LOD_DISTANCE = 1200
+AI_LOD_INTERVAL = 4
+PROFILER_HISTORY = 240
+SIM_DT = 1 / 60
+MAX_SIM_STEPS = 5
+INTERPOLATION_SNAP_DISTANCE = 64
+PROFILER_REFRESH_INTERVAL = 0.5
+PROFILER_LOG_INTERVAL = 2.0
+ASSET_WORKERS = 4
+ASSET_UPLOAD_BATCH = 4
+SHEET_CACHE_DIR = ".atlas_cache"
+SHEET_MAX_SIZE = 4096
+REPLAY_DIR = "replays"
+REPLAY_KEEP = 20
+REPLAY_MAGIC = b"PARP"
+REPLAY_VERSION = 2
+SNAPSHOT_DIR = "saves"
+SNAPSHOT_AUTOSAVE = f"{SNAPSHOT_DIR}/autosave.snap"
+SNAPSHOT_QUICKSAVE = f"{SNAPSHOT_DIR}/quicksave.snap"
+SNAPSHOT_AUTOSAVE_INTERVAL = 60.0
+SNAPSHOT_MAGIC = b"PASN"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SCALARS = (
+    ("time_elapsed", "d"),
+    ("wave", "i"),
+    ("level", "i"),
+    ("exp", "q"),
+    ("exp_max", "q"),
+    ("exp_multiplier", "d"),
+    ("base_exp_per_kill", "i"),
+    ("damage", "d"),
+    ("defence", "i"),
+    ("speed", "i"),
+    ("mobs_killed", "I"),
+    ("enemies_spawned", "I"),
+    ("lod_tick", "I"),
+    ("boss1_spawned", "?"),
+    ("boss2_spawned", "?"),
+    ("game_over", "?"),
+    ("win", "?"),
+    ("end_timer", "d"),
+    ("shoot_timer", "d"),
+    ("shot_cooldown", "d"),
+    ("skill_selecting", "?"),
+    ("skill5_passive_hp_bonus", "i"),
+    ("skill5_stacks", "i"),
+    ("skill5_max_stacks", "i"),
+    ("skill5_last_kill_time", "d"),
+    ("golem_hp", "d"),
+    ("golem_armed", "?"),
+    ("lightning_active", "?"),
+    ("lightning_phase", "B"),
+    ("lightning_radius", "d"),
+    ("lightning_x", "d"),
+    ("lightning_y", "d"),
+    ("separation_push", "d"),
+    ("spawn_extent", "i"),
+)
+REPLAY_EVENTS = {
+    "key": (1, struct.Struct("<qB")),
+    "click": (2, struct.Struct("<Bdd")),
+    "skill": (3, struct.Struct("<B")),
+    "choose": (4, struct.Struct("<B")),
+    "view": (5, struct.Struct("<HH")),
+}
 
 MAX_SKILLS = 5
+SKILL_SLOTS = 10
 
 ASSET_DIR = "images"
 MAP_IMAGE = f"{ASSET_DIR}/map.png"
 HERO_IMAGE = f"{ASSET_DIR}/hero1.png"
+ASSET_SEARCH_DIRS = (ASSET_DIR, ".")
+ASSET_MANIFEST_FILE = f"{ASSET_DIR}/manifest.json"
+ASSET_MANIFEST = dict(
+    [("map", ("map.png",))]
+    + [(f"hero:{i}", (f"hero{i}.png",)) for i in range(1, 5)]
+    + [(f"skill:{i}", (f"skils({i}).png", f"skils{i}.png")) for i in range(1, 10)]
+    + [
+        ("projectile:bullet", ("bull.png",)),
+        ("projectile:ice_ball", ("ice_ball.png",)),
+        ("projectile:witch_doktor", ("Witch_doctor_bullet.png", "witch_doctor_bullet.png")),
+        ("projectile:ork_boss", ("ork_boss_bullet.png",)),
+        ("enemy:pudge", ("enemy.png",)),
+        ("enemy:witch_doktor", ("witch_doktor.jpg", "witch_doktor.png")),
+        ("enemy:fire_archer", ("fire_archer.png", "fire_archer.jpg")),
+        ("boss:dragon", ("boss1.png",)),
+        ("boss:ork", ("boss2.png",)),
+        ("golem", ("skils8.png",)),
+    ]
+)
+SHEET_EXCLUDE = ("map",)
+PRELOAD_ASSETS = tuple(name for name in ASSET_MANIFEST if not name.startswith("skill:"))
 
 MAP_WIDTH = WORLD_WIDTH
 MAP_HEIGHT = WORLD_HEIGHT
 
 
+TEXTURE_CACHE = {}
+ASSET_INDEX = None
+
+
+def scan_assets():
+    try:
+        with open(ASSET_MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return {name: path for name, path in manifest.items() if path}
+    except Exception:
+        pass
+    files = set()
+    for folder in ASSET_SEARCH_DIRS:
+        try:
+            names = os.listdir(folder)
+        except Exception:
+            continue
+        for name in names:
+            files.add(name if folder == "." else f"{folder}/{name}")
+    index = {}
+    for name, candidates in ASSET_MANIFEST.items():
+        for folder in ASSET_SEARCH_DIRS:
+            for file_name in candidates:
+                path = file_name if folder == "." else f"{folder}/{file_name}"
+                if name not in index and path in files:
+                    index[name] = path
+    return index
+
+
+def write_asset_manifest(path=ASSET_MANIFEST_FILE):
+    global ASSET_INDEX
+    ASSET_INDEX = None
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({name: resolve_asset(name) for name in ASSET_MANIFEST}, f, indent=1, ensure_ascii=False)
+
+
+def resolve_asset(name):
+    global ASSET_INDEX
+    if ASSET_INDEX is None:
+        ASSET_INDEX = scan_assets()
+    return ASSET_INDEX.get(name)
+
+
+def asset_candidates(name):
+    path = resolve_asset(name)
+    return [path] if path else []
+
+
+def load_asset_texture(name):
+    path = resolve_asset(name)
+    if path is None:
+        return None
+    return load_texture_safe(path)
+
+
+def cached_texture(name):
+    path = resolve_asset(name)
+    if path is None:
+        return None
+    return TEXTURE_CACHE.get(path)
+
+
 def load_texture_safe(path):
+    tex = TEXTURE_CACHE.get(path)
+    if tex is not None:
+        return tex
     try:
-        return arcade.load_texture(path)
+        tex = arcade.load_texture(path)
     except Exception:
         return None
+    TEXTURE_CACHE[path] = tex
+    return tex
+
+
+def decode_texture(path):
+    if not os.path.isfile(path):
+        return path, None
+    try:
+        image = Image.open(path)
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        image.load()
+        tex = arcade.Texture(image)
+        tex.file_path = path
+        return path, tex
+    except Exception:
+        return path, None
+
+
+def texture_sheet_key(paths):
+    digest = hashlib.sha1()
+    found = []
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        digest.update(path.encode("utf-8"))
+        digest.update(hashlib.sha1(data).digest())
+        found.append(path)
+    return digest.hexdigest(), found
+
+
+def texture_sheet_path(key):
+    return os.path.join(SHEET_CACHE_DIR, f"sheet_{key}")
+
+
+def load_texture_sheet(paths):
+    try:
+        key, found = texture_sheet_key(paths)
+    except Exception:
+        return None, [], None
+    if not found:
+        return key, found, {}
+    base = texture_sheet_path(key)
+    try:
+        with open(base + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        regions = meta["regions"]
+        with open(base + ".rgba", "rb") as f:
+            sheet = Image.frombytes("RGBA", tuple(meta["size"]), f.read())
+    except Exception:
+        return key, found, None
+    if sorted(regions) != sorted(found):
+        return key, found, None
+    textures = {}
+    for path in found:
+        x, y, w, h = regions[path]
+        tex = arcade.Texture(sheet.crop((x, y, x + w, y + h)))
+        tex.file_path = path
+        textures[path] = tex
+    return key, found, textures
+
+
+def save_texture_sheet(key, images):
+    regions = {}
+    x = 0
+    y = 0
+    row_h = 0
+    width = 0
+    for path, image in sorted(images.items(), key=lambda item: -item[1].height):
+        w, h = image.size
+        if w > SHEET_MAX_SIZE:
+            return False
+        if x + w > SHEET_MAX_SIZE:
+            x = 0
+            y += row_h
+            row_h = 0
+        regions[path] = (x, y, w, h)
+        x += w
+        row_h = max(row_h, h)
+        width = max(width, x)
+    height = y + row_h
+    if not regions or height > SHEET_MAX_SIZE:
+        return False
+    sheet = Image.new("RGBA", (width, height))
+    for path, (x, y, w, h) in regions.items():
+        sheet.paste(images[path], (x, y))
+    base = texture_sheet_path(key)
+    try:
+        os.makedirs(SHEET_CACHE_DIR, exist_ok=True)
+        for name in os.listdir(SHEET_CACHE_DIR):
+            if name.startswith("sheet_") and not name.startswith(f"sheet_{key}"):
+                os.remove(os.path.join(SHEET_CACHE_DIR, name))
+        with open(base + ".tmp.rgba", "wb") as f:
+            f.write(sheet.tobytes())
+        os.replace(base + ".tmp.rgba", base + ".rgba")
+        with open(base + ".tmp.json", "w", encoding="utf-8") as f:
+            json.dump({"size": [width, height], "regions": regions}, f)
+        os.replace(base + ".tmp.json", base + ".json")
+    except Exception:
+        return False
+    return True
 
 
 def make_solid_sprite(width, height, color):
@@ -70,25 +357,46 @@ def make_solid_sprite(width, height, color):
         return sprite
 
 
-def make_sprite_from_candidates(candidates, scale, fallback_w, fallback_h, fallback_color):
+SPRITE_PROTOTYPES = {}
+
+
+def get_sprite_prototype(candidates, scale, fallback_w, fallback_h, fallback_color):
     if candidates is None:
         candidates = []
     if isinstance(candidates, str):
-        candidates = [candidates]
+        candidates = asset_candidates(candidates) if candidates in ASSET_MANIFEST else [candidates]
+    key = (tuple(candidates), scale, fallback_w, fallback_h, tuple(fallback_color))
+    proto = SPRITE_PROTOTYPES.get(key)
+    if proto is not None:
+        return proto
     for path in candidates:
+        source = load_texture_safe(path)
+        if source is None:
+            continue
         try:
             try:
-                return arcade.Sprite(path, scale=scale, hit_box_algorithm="Detailed")
+                proto = arcade.Sprite(source, scale=scale, hit_box_algorithm="Detailed")
             except TypeError:
-                return arcade.Sprite(path, scale=scale)
+                proto = arcade.Sprite(source, scale=scale)
+            break
         except Exception:
             continue
-    sprite = make_solid_sprite(fallback_w, fallback_h, fallback_color)
-    sprite.scale = 1.0
+    if proto is None:
+        proto = make_solid_sprite(fallback_w, fallback_h, fallback_color)
+        proto.scale = 1.0
+    SPRITE_PROTOTYPES[key] = proto
+    return proto
+
+
+def make_sprite_from_candidates(candidates, scale, fallback_w, fallback_h, fallback_color):
+    proto = get_sprite_prototype(candidates, scale, fallback_w, fallback_h, fallback_color)
+    sprite = arcade.Sprite()
+    apply_sprite_look(sprite, proto)
     return sprite
 
 
 def apply_sprite_look(dst, src):
+    dst.hit_reach = None
     try:
         dst.texture = src.texture
     except Exception:
@@ -102,6 +410,12 @@ def apply_sprite_look(dst, src):
         dst.height = src.height
     except Exception:
         pass
+    try:
+        dst.color = src.color
+    except Exception:
+        pass
+    if not hasattr(dst, "set_hit_box"):
+        return
     try:
         dst.set_hit_box(src.hit_box)
         return
@@ -119,10 +433,753 @@ def apply_sprite_look(dst, src):
         pass
 
 
+class SpritePool:
+    def __init__(self, max_free=POOL_MAX_FREE):
+        self.max_free = int(max_free)
+        self.free = {}
+        self.created = {}
+        self.reused = {}
+
+    def take(self, kind):
+        bucket = self.free.get(kind)
+        if bucket:
+            self.reused[kind] = self.reused.get(kind, 0) + 1
+            sprite = bucket.pop()
+            sprite.pooled = False
+            return sprite
+        self.created[kind] = self.created.get(kind, 0) + 1
+        return None
+
+    def release(self, sprite):
+        sprite.remove_from_sprite_lists()
+        kind = getattr(sprite, "pool_kind", None)
+        if kind is None or getattr(sprite, "pooled", False):
+            return
+        bucket = self.free.setdefault(kind, [])
+        if len(bucket) < self.max_free:
+            sprite.pooled = True
+            bucket.append(sprite)
+
+    def spawn(self, cls, x, y, target_x, target_y):
+        sprite = self.take(cls.__name__)
+        if sprite is None:
+            sprite = cls(x, y, target_x, target_y)
+            sprite.pool_kind = cls.__name__
+        else:
+            sprite.launch(x, y, target_x, target_y)
+        return sprite
+
+    def stats(self):
+        kinds = sorted(set(self.free) | set(self.created))
+        return {
+            kind: {
+                "free": len(self.free.get(kind, ())),
+                "created": self.created.get(kind, 0),
+                "reused": self.reused.get(kind, 0),
+            }
+            for kind in kinds
+        }
+
+
+class FrameProfiler:
+    def __init__(self, history=600):
+        self.history = int(history)
+        self.frames = []
+        self.current = {}
+        self.counts = {}
+        self.frame_start = 0.0
+
+    def begin_frame(self):
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def count(self, name, value):
+        self.counts[name] = value
+
+    def end_frame(self):
+        self.current["total"] = time.perf_counter() - self.frame_start
+        self.frames.append(self.current)
+        if len(self.frames) > self.history:
+            del self.frames[: len(self.frames) - self.history]
+
+    def reset(self):
+        self.frames = []
+
+    def summary(self):
+        names = []
+        for frame in self.frames:
+            for name in frame:
+                if name not in names:
+                    names.append(name)
+        result = {}
+        for name in names:
+            values = sorted(frame.get(name, 0.0) * 1000.0 for frame in self.frames)
+            n = len(values)
+            result[name] = {
+                "mean_ms": sum(values) / n,
+                "p95_ms": values[min(n - 1, int(n * 0.95))],
+                "p99_ms": values[min(n - 1, int(n * 0.99))],
+                "max_ms": values[-1],
+            }
+        return result
+
+
+class Replay:
+    header = struct.Struct("<4sHQBHHI")
+    stamp = struct.Struct("<IB")
+
+    def __init__(self, seed, selected_hero=0, view_width=800, view_height=500):
+        self.seed = int(seed)
+        self.selected_hero = int(selected_hero)
+        self.view_width = int(view_width)
+        self.view_height = int(view_height)
+        self.ticks = 0
+        self.events = []
+        self.cursor = 0
+
+    def record(self, tick, event):
+        self.events.append((tick, event))
+
+    def rewind(self):
+        self.cursor = 0
+
+    def inputs_at(self, tick):
+        events = self.events
+        start = end = self.cursor
+        while end < len(events) and events[end][0] <= tick:
+            end += 1
+        self.cursor = end
+        return [event for _, event in events[start:end]]
+
+    def to_bytes(self):
+        stamp = self.stamp
+        body = bytearray()
+        for tick, event in self.events:
+            code, fmt = REPLAY_EVENTS[event[0]]
+            body += stamp.pack(tick, code)
+            body += fmt.pack(*event[1:])
+        head = self.header.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.selected_hero,
+                                self.view_width, self.view_height, self.ticks)
+        return head + zlib.compress(bytes(body), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, hero, width, height, ticks = cls.header.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError("unsupported replay file")
+        replay = cls(seed, hero, width, height)
+        replay.ticks = ticks
+        codes = {code: (name, fmt) for name, (code, fmt) in REPLAY_EVENTS.items()}
+        body = zlib.decompress(data[cls.header.size:])
+        offset = 0
+        while offset < len(body):
+            tick, code = cls.stamp.unpack_from(body, offset)
+            offset += cls.stamp.size
+            name, fmt = codes[code]
+            replay.record(tick, (name,) + fmt.unpack_from(body, offset))
+            offset += fmt.size
+        return replay
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class Snapshot:
+    header = struct.Struct("<4sHBQHHI")
+    count = struct.Struct("<I")
+    scalars = struct.Struct("<" + "".join(fmt for _, fmt in SNAPSHOT_SCALARS))
+    hero = struct.Struct("<dddd")
+    skill_state = struct.Struct(f"<{SKILL_SLOTS * 3}dI")
+    rng_state = struct.Struct("<I625IBd")
+    enemy = struct.Struct("<BHfffffffIB")
+    effect = struct.Struct("<HBffff")
+    projectile = struct.Struct("<Bffffff")
+    orb = struct.Struct("<ffIiiBB")
+    golem = struct.Struct("<Bff")
+    ref = struct.Struct("<H")
+    skill = struct.Struct("<B")
+
+    def __init__(self, selected_hero=0, seed=0, view_width=800, view_height=500, sim_tick=0):
+        self.selected_hero = int(selected_hero)
+        self.seed = int(seed)
+        self.view_width = int(view_width)
+        self.view_height = int(view_height)
+        self.sim_tick = int(sim_tick)
+        self.scalar_values = ()
+        self.hero_values = (0.0, 0.0, 0.0, 0.0)
+        self.skill_values = (0.0,) * (SKILL_SLOTS * 3) + (0,)
+        self.rng_values = None
+        self.skills = []
+        self.pending_spawns = 0
+        self.enemies = []
+        self.bosses = []
+        self.effects = []
+        self.bullets = []
+        self.enemy_bullets = []
+        self.orbs = []
+        self.golem_values = (0, 0.0, 0.0)
+        self.lightning_hits = ([], [])
+
+    def to_bytes(self):
+        body = bytearray()
+        body += self.scalars.pack(*self.scalar_values)
+        body += self.hero.pack(*self.hero_values)
+        body += self.skill_state.pack(*self.skill_values)
+        body += self.rng_state.pack(*self.rng_values)
+        body += self.golem.pack(*self.golem_values)
+        body += self.count.pack(self.pending_spawns)
+        for fmt, records in (
+            (self.skill, [(skill_id,) for skill_id in self.skills]),
+            (self.enemy, self.enemies),
+            (self.enemy, self.bosses),
+            (self.effect, self.effects),
+            (self.projectile, self.bullets),
+            (self.projectile, self.enemy_bullets),
+            (self.orb, self.orbs),
+            (self.ref, [(ref,) for ref in self.lightning_hits[0]]),
+            (self.ref, [(ref,) for ref in self.lightning_hits[1]]),
+        ):
+            body += self.count.pack(len(records))
+            body += b"".join(fmt.pack(*record) for record in records)
+        head = self.header.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.selected_hero, self.seed,
+                                self.view_width, self.view_height, self.sim_tick)
+        return head + zlib.compress(bytes(body), 6)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, hero, seed, width, height, sim_tick = cls.header.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("unsupported snapshot file")
+        snapshot = cls(hero, seed, width, height, sim_tick)
+        body = zlib.decompress(data[cls.header.size:])
+        offset = 0
+        fields = []
+        for fmt in (cls.scalars, cls.hero, cls.skill_state, cls.rng_state, cls.golem, cls.count):
+            fields.append(fmt.unpack_from(body, offset))
+            offset += fmt.size
+        (snapshot.scalar_values, snapshot.hero_values, snapshot.skill_values,
+         snapshot.rng_values, snapshot.golem_values, (snapshot.pending_spawns,)) = fields
+        sections = []
+        for fmt in (cls.skill, cls.enemy, cls.enemy, cls.effect, cls.projectile, cls.projectile,
+                    cls.orb, cls.ref, cls.ref):
+            (n,) = cls.count.unpack_from(body, offset)
+            offset += cls.count.size
+            end = offset + n * fmt.size
+            sections.append(list(fmt.iter_unpack(body[offset:end])))
+            offset = end
+        (skills, snapshot.enemies, snapshot.bosses, snapshot.effects, snapshot.bullets,
+         snapshot.enemy_bullets, snapshot.orbs, hits_out, hits_in) = sections
+        snapshot.skills = [skill_id for (skill_id,) in skills]
+        snapshot.lightning_hits = ([ref for (ref,) in hits_out], [ref for (ref,) in hits_in])
+        return snapshot
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(path + ".tmp", path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def prune_replays(keep=REPLAY_KEEP):
+    try:
+        names = sorted(name for name in os.listdir(REPLAY_DIR) if name.endswith(".rep"))
+        for name in names[:-keep] if keep > 0 else names:
+            os.remove(os.path.join(REPLAY_DIR, name))
+    except Exception:
+        pass
+
+
+class SpatialHash:
+    def __init__(self, cell_size=COLLISION_CELL_SIZE):
+        self.cell_size = float(cell_size)
+        self.cells = {}
+
+    def clear(self):
+        self.cells = {}
+
+    def insert(self, item, x, y, radius):
+        size = self.cell_size
+        cx0 = int((x - radius) // size)
+        cx1 = int((x + radius) // size)
+        cy0 = int((y - radius) // size)
+        cy1 = int((y + radius) // size)
+        entry = (item, float(radius), cx0, cy0)
+        cells = self.cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [entry]
+                else:
+                    bucket.append(entry)
+
+    def insert_point(self, item, x, y):
+        size = self.cell_size
+        cx = int(x // size)
+        cy = int(y // size)
+        bucket = self.cells.get((cx, cy))
+        if bucket is None:
+            self.cells[(cx, cy)] = [(item, 0.0, cx, cy)]
+        else:
+            bucket.append((item, 0.0, cx, cy))
+
+    def pairs(self):
+        for (cx, cy), bucket in self.cells.items():
+            n = len(bucket)
+            if n < 2:
+                continue
+            for i in range(n - 1):
+                a, ra, ax, ay = bucket[i]
+                for j in range(i + 1, n):
+                    b, rb, bx, by = bucket[j]
+                    if (ax if ax > bx else bx) == cx and (ay if ay > by else by) == cy:
+                        yield a, ra, b, rb
+
+    def query(self, x, y, radius):
+        return [item for item, _ in self.query_entries(x, y, radius)]
+
+    def query_ring(self, x, y, inner, outer):
+        size = self.cell_size
+        cells = self.cells
+        found = []
+        if outer < 0:
+            return found
+        for cy in range(int((y - outer) // size), int((y + outer) // size) + 1):
+            y0 = cy * size
+            y1 = y0 + size
+            near_dy = 0.0 if y0 <= y <= y1 else min(abs(y - y0), abs(y - y1))
+            if near_dy > outer:
+                continue
+            half = math.sqrt(outer * outer - near_dy * near_dy)
+            cx0 = int((x - half) // size)
+            cx1 = int((x + half) // size)
+            skip0, skip1 = 1, 0
+            far_dy = max(abs(y - y0), abs(y - y1))
+            if inner > far_dy:
+                hole = math.sqrt(inner * inner - far_dy * far_dy)
+                skip0 = math.ceil((x - hole) / size)
+                skip1 = math.floor((x + hole) / size) - 1
+            for cx in range(cx0, cx1 + 1):
+                if skip0 <= cx <= skip1:
+                    continue
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.extend(entry[0] for entry in bucket)
+        return found
+
+    def query_entries(self, x, y, radius):
+        size = self.cell_size
+        qx0 = int((x - radius) // size)
+        qx1 = int((x + radius) // size)
+        qy0 = int((y - radius) // size)
+        qy1 = int((y + radius) // size)
+        cells = self.cells
+        found = []
+        for cx in range(qx0, qx1 + 1):
+            for cy in range(qy0, qy1 + 1):
+                bucket = cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for item, item_radius, ix, iy in bucket:
+                    if (ix if ix > qx0 else qx0) == cx and (iy if iy > qy0 else qy0) == cy:
+                        found.append((item, item_radius))
+        return found
+
+
+class EnemyArrays:
+    def __init__(self):
+        self.members = []
+        self.base_speed = np.zeros(0)
+        self.stop_distance = np.zeros(0)
+        self.half_w = np.zeros(0)
+        self.half_h = np.zeros(0)
+        self.lod_slot = np.zeros(0, dtype=np.int64)
+        self.lod_pending = np.zeros(0, dtype=np.int64)
+
+    def sync(self, enemies):
+        members = self.members
+        if len(members) == len(enemies) and all(a is b for a, b in zip(members, enemies)):
+            return
+        self.store_pending()
+        members = list(enemies)
+        n = len(members)
+        self.members = members
+        self.base_speed = np.fromiter((float(e.base_speed) for e in members), float, n)
+        self.stop_distance = np.fromiter((float(getattr(e, "stop_distance", 0.0)) for e in members), float, n)
+        self.half_w = np.fromiter((e.width // 2 for e in members), float, n)
+        self.half_h = np.fromiter((e.height // 2 for e in members), float, n)
+        self.lod_slot = np.fromiter((int(getattr(e, "lod_slot", 0) or 0) for e in members), np.int64, n)
+        self.lod_pending = np.fromiter((int(getattr(e, "lod_pending", 0)) for e in members), np.int64, n)
+
+    def store_pending(self):
+        for e, pending in zip(self.members, self.lod_pending.tolist()):
+            e.lod_pending = pending
+
+    def positions(self):
+        members = self.members
+        n = len(members)
+        x = np.fromiter((e.center_x for e in members), float, n)
+        y = np.fromiter((e.center_y for e in members), float, n)
+        return x, y
+
+    def schedule(self, x, y, anchors, radius, tick, interval):
+        if not radius or interval <= 1:
+            return np.ones(len(self.members), dtype=np.int64)
+        near = np.zeros(len(self.members), dtype=bool)
+        radius_sq = float(radius) * float(radius)
+        for ax, ay in anchors:
+            near |= (x - ax) ** 2 + (y - ay) ** 2 <= radius_sq
+        due = near | ((self.lod_slot + tick) % interval == 0)
+        steps = np.where(due, self.lod_pending + 1, 0)
+        self.lod_pending = np.where(due, 0, self.lod_pending + 1)
+        return steps
+
+    def step(self, target, x, y, steps):
+        members = self.members
+        active = np.flatnonzero(steps)
+        if active.size == 0:
+            return
+        x = x[active]
+        y = y[active]
+        if target is None:
+            for i in active.tolist():
+                members[i].shooting = False
+        else:
+            dx = target.center_x - x
+            dy = target.center_y - y
+            dist = np.hypot(dx, dy)
+            mult = np.fromiter((members[i].speed_multiplier for i in active.tolist()), float, active.size)
+            moving = dist > self.stop_distance[active]
+            speed = self.base_speed[active] * mult * steps[active]
+            step = np.where(moving, speed / np.where(dist > 0, dist, 1.0), 0.0)
+            x += dx * step
+            y += dy * step
+            for i, d, m in zip(active.tolist(), dist.tolist(), moving.tolist()):
+                if d > 0:
+                    members[i].shooting = not m
+        half_w = self.half_w[active]
+        half_h = self.half_h[active]
+        np.clip(x, half_w, MAP_WIDTH - half_w, out=x)
+        np.clip(y, half_h, MAP_HEIGHT - half_h, out=y)
+        for i, nx, ny in zip(active.tolist(), x.tolist(), y.tolist()):
+            members[i].position = (nx, ny)
+
+
+class TimedEffect:
+    interval = 0.0
+
+    def __init__(self, attribute=None):
+        self.attribute = attribute
+
+    def merge(self, entry, duration, magnitude):
+        entry[0] = max(entry[0], duration)
+        entry[1] = magnitude
+
+    def begin(self, entity, entry):
+        pass
+
+    def end(self, entity):
+        pass
+
+    def mirror(self, entity, remaining):
+        if self.attribute is not None:
+            setattr(entity, self.attribute, max(0.0, remaining))
+
+
+class DamageOverTime(TimedEffect):
+    def __init__(self, attribute, interval, flag):
+        super().__init__(attribute)
+        self.interval = float(interval)
+        self.flag = flag
+
+    def merge(self, entry, duration, magnitude):
+        entry[:] = [duration, magnitude, 0.0, 0.0]
+
+    def begin(self, entity, entry):
+        setattr(entity, self.flag, True)
+
+    def end(self, entity):
+        setattr(entity, self.flag, False)
+
+
+class SlowEffect(TimedEffect):
+    def merge(self, entry, duration, magnitude):
+        entry[0] = max(entry[0], duration)
+        entry[1] = min(entry[1], magnitude)
+
+    def begin(self, entity, entry):
+        entity.speed_multiplier = min(float(getattr(entity, "speed_multiplier", 1.0)), entry[1])
+
+    def end(self, entity):
+        entity.speed_multiplier = 1.0
+
+
+STATUS_EFFECTS = {
+    "poison": DamageOverTime("poison_duration", POISON_TICK_INTERVAL, "is_poisoned"),
+    "slow": SlowEffect("slow_timer"),
+    "hit_cooldown": TimedEffect("hit_cooldown"),
+}
+
+
+class StatusEffects:
+    def __init__(self, types=None):
+        self.types = dict(STATUS_EFFECTS if types is None else types)
+        self.tables = {kind: {} for kind in self.types}
+
+    def apply(self, entity, kind, duration, magnitude=0.0):
+        spec = self.types[kind]
+        table = self.tables[kind]
+        entry = table.get(entity)
+        if entry is None:
+            entry = [float(duration), float(magnitude), 0.0, 0.0]
+            table[entity] = entry
+        else:
+            spec.merge(entry, float(duration), float(magnitude))
+        spec.begin(entity, entry)
+        spec.mirror(entity, entry[0])
+
+    def has(self, entity, kind):
+        return entity in self.tables[kind]
+
+    def restore(self, entity, kind, entry):
+        spec = self.types[kind]
+        entry = [float(value) for value in entry]
+        self.tables[kind][entity] = entry
+        spec.begin(entity, entry)
+        spec.mirror(entity, entry[0])
+
+    def clear(self, entity, kind=None):
+        kinds = self.tables if kind is None else (kind,)
+        for name in kinds:
+            if self.tables[name].pop(entity, None) is not None:
+                spec = self.types[name]
+                spec.mirror(entity, 0.0)
+                spec.end(entity)
+
+    def discard(self, entity):
+        for table in self.tables.values():
+            table.pop(entity, None)
+
+    def active_count(self):
+        return sum(len(table) for table in self.tables.values())
+
+    def tick(self, delta_time, on_damage=None):
+        delta_time = float(delta_time)
+        damage = {}
+        for kind, table in self.tables.items():
+            if not table:
+                continue
+            spec = self.types[kind]
+            interval = spec.interval
+            expired = []
+            for entity, entry in table.items():
+                entry[0] -= delta_time
+                entry[2] += delta_time
+                if interval > 0:
+                    elapsed = entry[2] + min(0.0, entry[0])
+                    hits = 0
+                    while elapsed - entry[3] >= interval:
+                        entry[3] += interval
+                        hits += 1
+                    if hits:
+                        damage[entity] = damage.get(entity, 0.0) + hits * entry[1]
+                if entry[0] <= 0:
+                    expired.append(entity)
+                else:
+                    spec.mirror(entity, entry[0])
+            for entity in expired:
+                del table[entity]
+                spec.mirror(entity, 0.0)
+                spec.end(entity)
+        for entity, amount in damage.items():
+            (on_damage or self.apply_damage)(entity, amount)
+
+    def apply_damage(self, entity, amount):
+        entity.hp -= amount
+        if entity.hp <= 0:
+            entity.hp = 0.0
+            for kind, spec in self.types.items():
+                if spec.interval > 0:
+                    self.clear(entity, kind)
+
+
+class SkillSpec:
+    manual = True
+    resettable = True
+
+    def __init__(self, skill_id, cooldown=0.0, duration=0.0):
+        self.skill_id = skill_id
+        self.cooldown = float(cooldown)
+        self.duration = float(duration)
+
+    def ready(self, sim):
+        i = self.skill_id
+        return sim.skill_cooldowns[i] <= 0 and sim.skill_timers[i] <= 0
+
+    def activate(self, sim):
+        sim.skill_timers[self.skill_id] = self.duration
+        sim.skill_ticks[self.skill_id] = 0.0
+        sim.start_skill(self)
+
+    def tick(self, sim, delta_time):
+        timers = sim.skill_timers
+        i = self.skill_id
+        timers[i] = max(0.0, timers[i] - delta_time)
+        return timers[i] > 0
+
+    def expire(self, sim):
+        sim.skill_timers[self.skill_id] = 0.0
+        sim.skill_ticks[self.skill_id] = 0.0
+
+    def idle(self, sim, delta_time):
+        pass
+
+    def badges(self, sim):
+        remaining = sim.skill_timers[self.skill_id]
+        if remaining > 0:
+            return (("active", f"{remaining:.0f}s", "bottom"),)
+        return ()
+
+
+class PassiveSkill(SkillSpec):
+    manual = False
+    resettable = False
+
+    def ready(self, sim):
+        return False
+
+
+class CooldownResetSkill(PassiveSkill):
+    def __init__(self, skill_id, chance):
+        super().__init__(skill_id)
+        self.chance = float(chance)
+
+
+class RegenSkill(SkillSpec):
+    def activate(self, sim):
+        heal = float(sim.hero_sprite.max_hp) * 0.5
+        sim.hero_sprite.hp = min(sim.hero_sprite.hp + heal, sim.hero_sprite.max_hp)
+        super().activate(sim)
+
+
+class LightningSkill(SkillSpec):
+    def ready(self, sim):
+        return sim.skill_cooldowns[self.skill_id] <= 0 and not sim.lightning_active
+
+    def activate(self, sim):
+        sim.lightning_active = True
+        sim.lightning_phase = 0
+        sim.lightning_radius = 0.0
+        sim.lightning_x, sim.lightning_y = sim.hero_sprite.position
+        sim.lightning_hit_out = set()
+        sim.lightning_hit_in = set()
+        sim.start_skill(self)
+
+    def tick(self, sim, delta_time):
+        sim.update_lightning(delta_time)
+        return sim.lightning_active
+
+    def badges(self, sim):
+        if sim.lightning_active:
+            return (("on", "ON", "bottom"),)
+        return ()
+
+
+class AuraSkill(SkillSpec):
+    def ready(self, sim):
+        return sim.skill_cooldowns[self.skill_id] <= 0
+
+    def activate(self, sim):
+        if sim.skill_timers[self.skill_id] > 0:
+            sim.stop_skill(self.skill_id)
+            sim.start_skill(self, running=False)
+        else:
+            super().activate(sim)
+
+    def tick(self, sim, delta_time):
+        running = super().tick(sim, delta_time)
+        if running:
+            sim.update_aura(delta_time)
+        return running
+
+    def idle(self, sim, delta_time):
+        if (sim.skill_timers[self.skill_id] <= 0 and sim.skill5_stacks > 0 and
+                sim.time_elapsed - sim.skill5_last_kill_time > 10.0):
+            sim.skill5_stacks = max(0, sim.skill5_stacks - 1)
+            sim.update_skill5_passive_bonus()
+            sim.skill5_last_kill_time = sim.time_elapsed
+
+    def badges(self, sim):
+        badges = [("mode", "A" if sim.skill_timers[self.skill_id] > 0 else "P", "corner")]
+        badges.extend(super().badges(sim))
+        if sim.skill_timers[self.skill_id] <= 0 and sim.skill5_stacks > 0:
+            badges.append(("stacks", f"{sim.skill5_stacks}", "bottom"))
+        return badges
+
+
+class GolemSkill(SkillSpec):
+    def ready(self, sim):
+        return sim.skill_cooldowns[self.skill_id] <= 0 and not sim.golem_list
+
+    def activate(self, sim):
+        sim.golem_armed = True
+
+    def tick(self, sim, delta_time):
+        return super().tick(sim, delta_time) and sim.golem_hp > 0 and bool(sim.golem_list)
+
+    def expire(self, sim):
+        super().expire(sim)
+        for s in list(sim.golem_list):
+            s.remove_from_sprite_lists()
+        sim.golem_hp = 0.0
+
+    def badges(self, sim):
+        badges = []
+        if sim.golem_armed:
+            badges.append(("arm", "ARM", "top"))
+        if sim.golem_list:
+            badges.append(("golem", f"HP {int(sim.golem_hp)}", "bottom"))
+        return badges
+
+
+SKILLS = {
+    1: PassiveSkill(1, cooldown=math.inf),
+    2: RegenSkill(2, cooldown=25.0, duration=10.0),
+    3: PassiveSkill(3),
+    4: LightningSkill(4, cooldown=14.0),
+    5: AuraSkill(5, cooldown=5.0, duration=20.0),
+    6: SkillSpec(6, cooldown=50.0, duration=20.0),
+    7: SkillSpec(7, cooldown=60.0, duration=15.0),
+    8: GolemSkill(8, cooldown=90.0, duration=60.0),
+    9: CooldownResetSkill(9, chance=0.25),
+}
+
+
 class Hero(arcade.Sprite):
     def __init__(self, texture_candidates, scale=0.25):
         super().__init__()
-        sprite = make_sprite_from_candidates(
+        sprite = get_sprite_prototype(
             texture_candidates,
             scale=scale,
             fallback_w=64,
@@ -139,49 +1196,17 @@ class Hero(arcade.Sprite):
         self.collision_radius = 40
         self.is_poisoned = False
         self.poison_duration = 0.0
-        self.poison_damage_timer = 0.0
-        self.poison_last_tick = 0.0
-        self.poison_damage_per_second = float(POISON_DAMAGE_PER_SECOND)
-
-    def apply_poison(self, duration=POISON_DURATION, damage_per_second=POISON_DAMAGE_PER_SECOND):
-        self.is_poisoned = True
-        self.poison_duration = float(duration)
-        self.poison_damage_per_second = float(damage_per_second)
-        self.poison_damage_timer = 0.0
-        self.poison_last_tick = 0.0
-
-    def update_poison(self, delta_time):
-        if not self.is_poisoned:
-            return
-        self.poison_duration -= float(delta_time)
-        self.poison_damage_timer += float(delta_time)
-        if self.poison_damage_timer - self.poison_last_tick >= float(POISON_TICK_INTERVAL):
-            self.hp -= float(self.poison_damage_per_second)
-            self.poison_last_tick = self.poison_damage_timer
-            if self.hp <= 0:
-                self.hp = 0.0
-                self.is_poisoned = False
-        if self.poison_duration <= 0:
-            self.is_poisoned = False
-
-
-class FireArrow(arcade.Sprite):
-    def __init__(self, x, y, target_x, target_y):
-        super().__init__()
-        sprite = make_sprite_from_candidates(
-            [
-                f"{ASSET_DIR}/bull.png",
-            ],
-            scale=0.08,
-            fallback_w=14,
-            fallback_h=14,
-            fallback_color=arcade.color.ORANGE,
-        )
-        apply_sprite_look(self, sprite)
+
+
+class Projectile(arcade.Sprite):
+    base_damage = 10
+    angle_offset = -90
+    status_effects = ()
+
+    def launch(self, x, y, target_x, target_y):
         self.center_x = x
         self.center_y = y
-        self.speed = float(FIRE_ARROW_SPEED)
-        self.damage = 10
+        self.damage = self.base_damage
         dx = target_x - x
         dy = target_y - y
         dist = math.hypot(dx, dy)
@@ -190,113 +1215,106 @@ class FireArrow(arcade.Sprite):
         self.change_x = (dx / dist) * self.speed
         self.change_y = (dy / dist) * self.speed
         try:
-            self.angle = math.degrees(math.atan2(dy, dx)) - 90
+            self.angle = math.degrees(math.atan2(dy, dx)) + self.angle_offset
         except Exception:
             pass
+
+
+class HeroBullet(Projectile):
+    angle_offset = 0
+
+    def __init__(self, x, y, target_x, target_y):
+        super().__init__()
+        sprite = get_sprite_prototype(
+            "projectile:bullet",
+            scale=0.12,
+            fallback_w=10,
+            fallback_h=10,
+            fallback_color=arcade.color.GOLD,
+        )
+        apply_sprite_look(self, sprite)
+        self.speed = 14.0
+        self.collision_radius = 8
+        self.launch(x, y, target_x, target_y)
+
+
+class FireArrow(Projectile):
+    base_damage = 10
+
+    def __init__(self, x, y, target_x, target_y):
+        super().__init__()
+        sprite = get_sprite_prototype(
+            "projectile:bullet",
+            scale=0.08,
+            fallback_w=14,
+            fallback_h=14,
+            fallback_color=arcade.color.ORANGE,
+        )
+        apply_sprite_look(self, sprite)
+        self.speed = float(FIRE_ARROW_SPEED)
         self.collision_radius = 15
+        self.launch(x, y, target_x, target_y)
+
 
+class IceBall(Projectile):
+    base_damage = 200
 
-class IceBall(arcade.Sprite):
     def __init__(self, x, y, target_x, target_y):
         super().__init__()
-        sprite = make_sprite_from_candidates(
-            [
-                f"{ASSET_DIR}/ice_ball.png",
-            ],
+        sprite = get_sprite_prototype(
+            "projectile:ice_ball",
             scale=0.22,
             fallback_w=18,
             fallback_h=18,
             fallback_color=arcade.color.BLUE,
         )
         apply_sprite_look(self, sprite)
-        self.center_x = x
-        self.center_y = y
         self.speed = float(ICE_BALL_SPEED)
-        self.damage = 200
-        dx = target_x - x
-        dy = target_y - y
-        dist = math.hypot(dx, dy)
-        if dist == 0:
-            dist = 1.0
-        self.change_x = (dx / dist) * self.speed
-        self.change_y = (dy / dist) * self.speed
-        try:
-            self.angle = math.degrees(math.atan2(dy, dx)) - 90
-        except Exception:
-            pass
         self.collision_radius = 20
+        self.launch(x, y, target_x, target_y)
 
 
-class WitchDoktorBullet(arcade.Sprite):
+class WitchDoktorBullet(Projectile):
+    base_damage = int(WITCH_DOKTOR_BULLET_DAMAGE)
+    status_effects = (("poison", POISON_DURATION, POISON_DAMAGE_PER_SECOND),)
+
     def __init__(self, x, y, target_x, target_y):
         super().__init__()
-        sprite = make_sprite_from_candidates(
-            [
-                f"{ASSET_DIR}/Witch_doctor_bullet.png",
-                f"{ASSET_DIR}/witch_doctor_bullet.png",
-                "Witch_doctor_bullet.png",
-                "witch_doctor_bullet.png",
-            ],
+        sprite = get_sprite_prototype(
+            "projectile:witch_doktor",
             scale=0.1,
             fallback_w=16,
             fallback_h=16,
             fallback_color=arcade.color.GREEN,
         )
         apply_sprite_look(self, sprite)
-        self.center_x = x
-        self.center_y = y
         self.speed = float(WITCH_DOKTOR_BULLET_SPEED)
-        self.damage = int(WITCH_DOKTOR_BULLET_DAMAGE)
-        self.poison_duration = float(POISON_DURATION)
-        self.poison_damage_per_second = float(POISON_DAMAGE_PER_SECOND)
-        dx = target_x - x
-        dy = target_y - y
-        dist = math.hypot(dx, dy)
-        if dist == 0:
-            dist = 1.0
-        self.change_x = (dx / dist) * self.speed
-        self.change_y = (dy / dist) * self.speed
-        try:
-            self.angle = math.degrees(math.atan2(dy, dx)) - 90
-        except Exception:
-            pass
         self.collision_radius = 20
+        self.launch(x, y, target_x, target_y)
+
 
+class OrkBossBullet(Projectile):
+    base_damage = int(ORC_BOSS_DAMAGE)
 
-class OrkBossBullet(arcade.Sprite):
     def __init__(self, x, y, target_x, target_y):
         super().__init__()
-        sprite = make_sprite_from_candidates(
-            [
-                f"{ASSET_DIR}/ork_boss_bullet.png"],
+        sprite = get_sprite_prototype(
+            "projectile:ork_boss",
             scale=0.15,
             fallback_w=20,
             fallback_h=20,
             fallback_color=arcade.color.DARK_RED,
         )
         apply_sprite_look(self, sprite)
-        self.center_x = x
-        self.center_y = y
         self.speed = float(WITCH_DOKTOR_BULLET_SPEED)
-        self.damage = int(ORC_BOSS_DAMAGE)
-        dx = target_x - x
-        dy = target_y - y
-        dist = math.hypot(dx, dy)
-        if dist == 0:
-            dist = 1.0
-        self.change_x = (dx / dist) * self.speed
-        self.change_y = (dy / dist) * self.speed
-        try:
-            self.angle = math.degrees(math.atan2(dy, dx)) - 90
-        except Exception:
-            pass
         self.collision_radius = 25
+        self.launch(x, y, target_x, target_y)
 
 
 class EnemyBase(arcade.Sprite):
-    def __init__(self, texture_candidates, scale, x, y, target, collision_radius):
+    def __init__(self, texture_candidates, scale, x, y, target, collision_radius, rng=random):
         super().__init__()
-        sprite = make_sprite_from_candidates(
+        sprite = get_sprite_prototype(
             texture_candidates,
             scale=scale,
             fallback_w=48,
@@ -310,17 +1328,24 @@ class EnemyBase(arcade.Sprite):
         self.collision_radius = float(collision_radius)
         self.max_hp = float(ENEMY_MAX_HP)
         self.hp = float(self.max_hp)
-        self.damage = int(random.randint(5, 10))
+        self.damage = int(rng.randint(5, 10))
         self.base_speed = 1.5
         self.speed_multiplier = 1.0
         self.slow_timer = 0.0
         self.hit_cooldown = 0.0
         self.is_poisoned = False
         self.poison_duration = 0.0
-        self.poison_damage_timer = 0.0
-        self.poison_last_tick = 0.0
-        self.poison_damage_per_second = float(POISON_DAMAGE_PER_SECOND)
+        self.stop_distance = 0.0
         self.shooting = False
+        self.projectile_pool = None
+        self.lod_slot = None
+        self.lod_pending = 0
+
+    def make_projectile(self, cls):
+        pool = self.projectile_pool
+        if pool is None:
+            return cls(self.center_x, self.center_y, self.target.center_x, self.target.center_y)
+        return pool.spawn(cls, self.center_x, self.center_y, self.target.center_x, self.target.center_y)
 
     def take_damage(self, damage):
         self.hp -= float(damage)
@@ -329,92 +1354,66 @@ class EnemyBase(arcade.Sprite):
             return True
         return False
 
-    def apply_slow(self, factor, duration):
-        try:
-            factor = float(factor)
-        except Exception:
-            factor = 1.0
-        self.speed_multiplier = min(self.speed_multiplier, factor)
-        self.slow_timer = max(self.slow_timer, float(duration))
-
-    def apply_poison(self, duration=POISON_DURATION, damage_per_second=POISON_DAMAGE_PER_SECOND):
-        self.is_poisoned = True
-        self.poison_duration = float(duration)
-        self.poison_damage_per_second = float(damage_per_second)
-        self.poison_damage_timer = 0.0
-        self.poison_last_tick = 0.0
-
-    def update_poison(self, delta_time):
-        if not self.is_poisoned:
-            return
-        self.poison_duration -= float(delta_time)
-        self.poison_damage_timer += float(delta_time)
-        if self.poison_damage_timer - self.poison_last_tick >= float(POISON_TICK_INTERVAL):
-            self.hp -= float(self.poison_damage_per_second)
-            self.poison_last_tick = self.poison_damage_timer
-            if self.hp <= 0:
-                self.hp = 0.0
-                self.is_poisoned = False
-        if self.poison_duration <= 0:
-            self.is_poisoned = False
-
-    def update_state(self, delta_time):
-        if self.hit_cooldown > 0:
-            self.hit_cooldown = max(0.0, self.hit_cooldown - float(delta_time))
-        if self.slow_timer > 0:
-            self.slow_timer = max(0.0, self.slow_timer - float(delta_time))
-            if self.slow_timer == 0.0:
-                self.speed_multiplier = 1.0
-        if self.is_poisoned:
-            self.update_poison(delta_time)
-
     def try_shoot(self):
         return None
 
+    def tick_timers(self, delta_time):
+        pass
+
+    def seek_target(self, steps=1):
+        if self.target is None:
+            self.shooting = False
+            return
+        dx = self.target.center_x - self.center_x
+        dy = self.target.center_y - self.center_y
+        dist = math.hypot(dx, dy)
+        if dist > 0:
+            if dist > self.stop_distance:
+                speed = float(self.base_speed) * float(self.speed_multiplier) * steps
+                self.center_x += (dx / dist) * speed
+                self.center_y += (dy / dist) * speed
+                self.shooting = False
+            else:
+                self.shooting = True
+
+    def update(self, delta_time: float = 1 / 60):
+        self.tick_timers(delta_time)
+        self.seek_target()
+
 
 class EnemiesPudge(EnemyBase):
-    def __init__(self, x, y, target, level):
+    def __init__(self, x, y, target, level, rng=random):
         super().__init__(
-            [f"{ASSET_DIR}/enemy.png", "enemy.png"],
+            "enemy:pudge",
             scale=0.05,
             x=x,
             y=y,
             target=target,
             collision_radius=35,
+            rng=rng,
         )
         self.max_hp = float(120 + level * 2.2)
         self.hp = float(self.max_hp)
         self.base_speed = 1.8 + min(1.4, level * 0.008)
-        self.damage = int(random.randint(7, 12) * (2.0 + level * 0.01))
+        self.damage = int(rng.randint(7, 12) * (2.0 + level * 0.01))
         self.shooting = False
 
-    def update(self, delta_time: float = 1 / 60):
-        self.update_state(delta_time)
-        if self.target is None:
-            return
-        dx = self.target.center_x - self.center_x
-        dy = self.target.center_y - self.center_y
-        dist = math.hypot(dx, dy)
-        if dist > 0:
-            speed = float(self.base_speed) * float(self.speed_multiplier)
-            self.center_x += (dx / dist) * speed
-            self.center_y += (dy / dist) * speed
-
 
 class WitchDoktor(EnemyBase):
-    def __init__(self, x, y, target, level):
+    def __init__(self, x, y, target, level, rng=random):
         super().__init__(
-            [f"{ASSET_DIR}/witch_doktor.jpg", f"{ASSET_DIR}/witch_doktor.png", "witch_doktor.jpg", "witch_doktor.png"],
+            "enemy:witch_doktor",
             scale=0.08,
             x=x,
             y=y,
             target=target,
             collision_radius=45,
+            rng=rng,
         )
         self.max_hp = float(WITCH_DOKTOR_MAX_HP + level * 1.4)
         self.hp = float(self.max_hp)
         self.base_speed = float(WITCH_DOKTOR_SPEED)
-        self.damage = int(random.randint(7, 11) * (2.0 + level * 0.01))
+        self.damage = int(rng.randint(7, 11) * (2.0 + level * 0.01))
         self.bullet_cooldown = 0.0
         self.stop_distance = float(WITCH_DOKTOR_STOP_DISTANCE)
         self.shooting = False
@@ -423,52 +1422,33 @@ class WitchDoktor(EnemyBase):
         if self.bullet_cooldown > 0:
             return None
         self.bullet_cooldown = float(WITCH_DOKTOR_BULLET_COOLDOWN)
-        bullet = WitchDoktorBullet(self.center_x, self.center_y, self.target.center_x, self.target.center_y)
+        bullet = self.make_projectile(WitchDoktorBullet)
         bullet.damage = int(max(float(bullet.damage), float(self.damage)))
         return bullet
 
     def try_shoot(self):
         return self.witch_doktor_bullet()
 
-    def update(self, delta_time):
-        self.update_state(delta_time)
+    def tick_timers(self, delta_time):
         if self.bullet_cooldown > 0:
             self.bullet_cooldown = max(0.0, self.bullet_cooldown - float(delta_time))
-        if self.target is None:
-            self.shooting = False
-            return
-        dx = self.target.center_x - self.center_x
-        dy = self.target.center_y - self.center_y
-        dist = math.hypot(dx, dy)
-        if dist > 0:
-            if dist > self.stop_distance:
-                speed = float(self.base_speed) * float(self.speed_multiplier)
-                self.center_x += (dx / dist) * speed
-                self.center_y += (dy / dist) * speed
-                self.shooting = False
-            else:
-                self.shooting = True
 
 
 class FireArchers(EnemyBase):
-    def __init__(self, x, y, target, level):
+    def __init__(self, x, y, target, level, rng=random):
         super().__init__(
-            [
-                f"{ASSET_DIR}/fire_archer.png",
-                f"{ASSET_DIR}/fire_archer.jpg",
-                "fire_archer.png",
-                "fire_archer.jpg",
-            ],
+            "enemy:fire_archer",
             scale=0.06,
             x=x,
             y=y,
             target=target,
             collision_radius=30,
+            rng=rng,
         )
         self.max_hp = float(130 + level * 1.9)
         self.hp = float(self.max_hp)
         self.base_speed = 1.7 + min(1.0, level * 0.006)
-        self.damage = int(random.randint(6, 10) * (2.0 + level * 0.011))
+        self.damage = int(rng.randint(6, 10) * (2.0 + level * 0.011))
         self.arrow_cooldown = 0.0
         self.stop_distance = 260.0
         self.shooting = False
@@ -477,40 +1457,22 @@ class FireArchers(EnemyBase):
         if self.arrow_cooldown > 0:
             return None
         self.arrow_cooldown = float(ARROW_COOLDOWN)
-        arrow = FireArrow(self.center_x, self.center_y, self.target.center_x, self.target.center_y)
+        arrow = self.make_projectile(FireArrow)
         arrow.damage = int(max(float(arrow.damage), float(self.damage)))
         return arrow
 
     def try_shoot(self):
         return self.fire_arrow()
 
-    def update(self, delta_time):
-        self.update_state(delta_time)
+    def tick_timers(self, delta_time):
         if self.arrow_cooldown > 0:
             self.arrow_cooldown = max(0.0, self.arrow_cooldown - float(delta_time))
-        if self.target is None:
-            self.shooting = False
-            return
-        dx = self.target.center_x - self.center_x
-        dy = self.target.center_y - self.center_y
-        dist = math.hypot(dx, dy)
-        if dist > 0:
-            if dist > self.stop_distance:
-                speed = float(self.base_speed) * float(self.speed_multiplier)
-                self.center_x += (dx / dist) * speed
-                self.center_y += (dy / dist) * speed
-                self.shooting = False
-            else:
-                self.shooting = True
 
 
 class BossDragon(EnemyBase):
     def __init__(self, x, y, target, level):
         super().__init__(
-            [
-                f"{ASSET_DIR}/boss1.png",
-                "boss1.png",
-            ],
+            "boss:dragon",
             scale=0.35,
             x=x,
             y=y,
@@ -529,40 +1491,22 @@ class BossDragon(EnemyBase):
         if self.ice_cooldown > 0:
             return None
         self.ice_cooldown = float(ICE_BALL_COOLDOWN)
-        ball = IceBall(self.center_x, self.center_y, self.target.center_x, self.target.center_y)
+        ball = self.make_projectile(IceBall)
         ball.damage = int(max(float(ball.damage), float(self.damage)))
         return ball
 
     def try_shoot(self):
         return self.ice_ball()
 
-    def update(self, delta_time):
-        self.update_state(delta_time)
+    def tick_timers(self, delta_time):
         if self.ice_cooldown > 0:
             self.ice_cooldown = max(0.0, self.ice_cooldown - float(delta_time))
-        if self.target is None:
-            self.shooting = False
-            return
-        dx = self.target.center_x - self.center_x
-        dy = self.target.center_y - self.center_y
-        dist = math.hypot(dx, dy)
-        if dist > 0:
-            if dist > self.stop_distance:
-                speed = float(self.base_speed) * float(self.speed_multiplier)
-                self.center_x += (dx / dist) * speed
-                self.center_y += (dy / dist) * speed
-                self.shooting = False
-            else:
-                self.shooting = True
 
 
 class OrkBoss(EnemyBase):
     def __init__(self, x, y, target, level):
         super().__init__(
-            [
-                f"{ASSET_DIR}/boss2.png",
-                "boss2.png",
-            ],
+            "boss:ork",
             scale=0.7,
             x=x,
             y=y,
@@ -582,17 +1526,18 @@ class OrkBoss(EnemyBase):
         if self.attack_cooldown > 0:
             return None
         self.attack_cooldown = float(ORC_BOSS_ATTACK_COOLDOWN)
-        bullet = OrkBossBullet(self.center_x, self.center_y, self.target.center_x, self.target.center_y)
+        bullet = self.make_projectile(OrkBossBullet)
         bullet.damage = int(max(float(bullet.damage), float(self.damage)))
         return bullet
 
     def try_shoot(self):
         return self.ork_boss_attack()
 
-    def update(self, delta_time):
-        self.update_state(delta_time)
+    def tick_timers(self, delta_time):
         if self.attack_cooldown > 0:
             self.attack_cooldown = max(0.0, self.attack_cooldown - float(delta_time))
+
+    def seek_target(self, steps=1):
         if self.target is None:
             self.shooting = False
             return
@@ -601,14 +1546,14 @@ class OrkBoss(EnemyBase):
         dist = math.hypot(dx, dy)
         if dist > 0:
             if dist > self.stop_distance:
-                speed = float(self.base_speed) * float(self.speed_multiplier)
+                speed = float(self.base_speed) * float(self.speed_multiplier) * steps
                 self.center_x += (dx / dist) * speed
                 self.center_y += (dy / dist) * speed
                 self.shooting = False
             elif dist <= self.attack_range:
                 self.shooting = True
             else:
-                speed = float(self.base_speed) * float(self.speed_multiplier)
+                speed = float(self.base_speed) * float(self.speed_multiplier) * steps
                 self.center_x += (dx / dist) * speed
                 self.center_y += (dy / dist) * speed
                 self.shooting = False
@@ -616,21 +1561,213 @@ class OrkBoss(EnemyBase):
 
 Enemies_pudge = EnemiesPudge
 
+SNAPSHOT_ENEMY_KINDS = (
+    (EnemiesPudge, None),
+    (FireArchers, "arrow_cooldown"),
+    (WitchDoktor, "bullet_cooldown"),
+    (BossDragon, "ice_cooldown"),
+    (OrkBoss, "attack_cooldown"),
+)
+SNAPSHOT_PROJECTILE_KINDS = (HeroBullet, FireArrow, IceBall, WitchDoktorBullet, OrkBossBullet)
 
-class Start_menu(arcade.View):
+
+class TextCache:
+    def __init__(self):
+        self.batch = pyglet.graphics.Batch()
+        self.labels = {}
+        self.used = set()
+
+    def begin(self):
+        self.used = set()
+
+    def text(self, key, value, x, y, color, font_size, **kwargs):
+        label = self.labels.get(key)
+        if label is None:
+            label = arcade.Text(value, x, y, color, font_size, batch=self.batch, **kwargs)
+            self.labels[key] = label
+        else:
+            if label.text != value:
+                label.text = value
+            if label.x != x or label.y != y:
+                label.position = (x, y)
+            if not label.visible:
+                label.visible = True
+        self.used.add(key)
+
+    def end(self):
+        for key, label in self.labels.items():
+            if key not in self.used and label.visible:
+                label.visible = False
+
+    def draw(self):
+        self.batch.draw()
+
+
+class IconLayer:
     def __init__(self):
+        self.sprites = arcade.SpriteList()
+        self.entries = ()
+
+    def draw(self, entries):
+        entries = tuple(entries)
+        if entries != self.entries:
+            self.entries = entries
+            sprites = self.sprites
+            while len(sprites) > len(entries):
+                sprites.pop()
+            for i, (tex, x, y, size) in enumerate(entries):
+                if i < len(sprites):
+                    sprite = sprites[i]
+                else:
+                    sprite = arcade.Sprite()
+                    sprites.append(sprite)
+                sprite.texture = tex
+                sprite.width = size
+                sprite.height = size
+                sprite.position = (x, y)
+        if entries:
+            self.sprites.draw()
+
+
+SPRITE_WARMUP = tuple(
+    [(Hero, (f"hero:{i}",)) for i in range(1, 5)]
+    + [(cls, (0, 0, 1, 0)) for cls in (HeroBullet, FireArrow, IceBall, WitchDoktorBullet, OrkBossBullet)]
+    + [(cls, (0, 0, None, 1)) for cls in (EnemiesPudge, WitchDoktor, FireArchers, BossDragon, OrkBoss)]
+    + [(make_sprite_from_candidates, ("golem", 2, 90, 90, arcade.color.ORANGE))]
+)
+
+
+class AssetLoader:
+    def __init__(self, names=PRELOAD_ASSETS, workers=ASSET_WORKERS, batch=ASSET_UPLOAD_BATCH):
+        self.batch = max(1, int(batch))
+        paths = dict.fromkeys(resolve_asset(name) for name in names)
+        excluded = {resolve_asset(name) for name in SHEET_EXCLUDE}
+        self.paths = [path for path in paths if path is not None and path not in TEXTURE_CACHE]
+        self.sheet_paths = [path for path in self.paths if path not in excluded]
+        self.warmup = list(SPRITE_WARMUP)
+        self.total = len(self.paths) + len(self.warmup)
+        self.done = 0
+        self.ready = []
+        self.sheet_key = None
+        self.sheet_hit = False
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, int(workers)))
+        self.futures = [
+            self.executor.submit(decode_texture, path) for path in self.paths if path not in self.sheet_paths
+        ]
+        self.sheet_future = None
+        if self.sheet_paths:
+            self.sheet_future = self.executor.submit(load_texture_sheet, self.sheet_paths)
+
+    def progress(self):
+        if self.total <= 0:
+            return 1.0
+        return min(1.0, self.done / self.total)
+
+    def is_done(self):
+        return self.sheet_future is None and not self.futures and not self.ready and not self.warmup
+
+    def store(self, path, tex):
+        self.done += 1
+        if tex is None:
+            return
+        TEXTURE_CACHE[path] = tex
+        try:
+            arcade.get_window().ctx.default_atlas.add(tex)
+        except Exception:
+            pass
+
+    def take_sheet(self, wait=False):
+        future = self.sheet_future
+        if future is None or (not wait and not future.done()):
+            return
+        self.sheet_future = None
+        key, found, textures = future.result()
+        self.done += len(self.sheet_paths) - len(found)
+        if textures is not None:
+            self.sheet_hit = True
+            self.ready.extend(textures.items())
+            return
+        self.sheet_key = key
+        self.futures.extend(self.executor.submit(decode_texture, path) for path in found)
+
+    def save_sheet(self):
+        if self.sheet_key is None or self.futures or self.ready or self.sheet_future is not None:
+            return
+        images = {}
+        for path in self.sheet_paths:
+            tex = TEXTURE_CACHE.get(path)
+            if tex is not None:
+                images[path] = tex.image
+        key = self.sheet_key
+        self.sheet_key = None
+        if images:
+            self.executor.submit(save_texture_sheet, key, images)
+
+    def warm_next(self):
+        cls, args = self.warmup.pop(0)
+        self.done += 1
+        try:
+            cls(*args)
+        except Exception:
+            pass
+
+    def poll(self, limit=None):
+        if limit is None:
+            limit = self.batch
+        self.take_sheet()
+        handled = 0
+        while handled < limit and self.ready:
+            self.store(*self.ready.pop(0))
+            handled += 1
+        pending = []
+        for future in self.futures:
+            if handled < limit and future.done():
+                self.store(*future.result())
+                handled += 1
+            else:
+                pending.append(future)
+        self.futures = pending
+        self.save_sheet()
+        while handled < limit and self.sheet_future is None and not self.futures and not self.ready and self.warmup:
+            self.warm_next()
+            handled += 1
+        if self.is_done():
+            self.executor.shutdown(wait=False)
+        return handled
+
+
+class Start_menu(arcade.View):
+    def __init__(self, seed=None):
         super().__init__()
-        self.map = load_texture_safe(MAP_IMAGE)
-        if self.map is None:
-            self.map = load_texture_safe("map.png")
+        self.seed = seed
+        self.loader = AssetLoader()
+        self.map = None
         self.speed = 5
         self.selected_hero = 0
-        self.hero_textures = []
+        self.start_requested = False
+        self.hero_textures = [None] * 4
+        self.progress_text = TextCache()
+        self.refresh_textures()
+
+    def refresh_textures(self):
+        if self.map is None:
+            self.map = cached_texture("map")
         for i in range(4):
-            tex = load_texture_safe(f"{ASSET_DIR}/hero{i + 1}.png")
-            if tex is None:
-                tex = load_texture_safe(f"hero{i + 1}.png")
-            self.hero_textures.append(tex)
+            if self.hero_textures[i] is None:
+                self.hero_textures[i] = cached_texture(f"hero:{i + 1}")
+
+    def on_update(self, delta_time):
+        if not self.loader.is_done():
+            self.loader.poll()
+            self.refresh_textures()
+        if self.start_requested and self.loader.is_done():
+            self.start_game()
+
+    def start_game(self):
+        self.start_requested = False
+        self.refresh_textures()
+        game_view = MyGame(selected_hero=self.selected_hero, seed=self.seed)
+        self.window.show_view(game_view)
 
     def on_draw(self):
         self.clear()
@@ -679,8 +1816,10 @@ class Start_menu(arcade.View):
             panel_x, panel_y, panel_w, panel_h, (255, 255, 255, 190)
         )
 
+        loading = not self.loader.is_done()
         arcade.draw_lbwh_rectangle_filled(
-            button1_x, button1_y, button_width, button_height, fill_color)
+            button1_x, button1_y, button_width, button_height,
+            arcade.color.GRAY if loading else fill_color)
         arcade.draw_lbwh_rectangle_outline(
             button1_x, button1_y, button_width, button_height, outline_color)
 
@@ -689,11 +1828,26 @@ class Start_menu(arcade.View):
         arcade.draw_lbwh_rectangle_outline(
             button2_x, button2_y, button_width, button_height, outline_color)
 
-        arcade.draw_text("НАЧАТЬ ИГРАТЬ", button1_x + button_width // 2, button1_y + 40,
+        start_label = "ЗАГРУЗКА..." if loading and self.start_requested else "НАЧАТЬ ИГРАТЬ"
+        arcade.draw_text(start_label, button1_x + button_width // 2, button1_y + 40,
                          arcade.color.BLACK, font_size=20, anchor_x="center", anchor_y="center")
         arcade.draw_text("СМЕНА", button2_x + button_width // 2, button2_y + 40,
                          arcade.color.BLACK, font_size=20, anchor_x="center", anchor_y="center")
 
+        if loading:
+            bar_y = panel_y - 40
+            arcade.draw_lbwh_rectangle_filled(
+                button2_x, bar_y, button_width * self.loader.progress(), 14, arcade.color.DARK_GREEN)
+            arcade.draw_lbwh_rectangle_outline(
+                button2_x, bar_y, button_width, 14, outline_color)
+            self.progress_text.begin()
+            self.progress_text.text(
+                "progress", f"Загрузка {int(self.loader.progress() * 100)}%",
+                button2_x + button_width // 2, bar_y - 16, arcade.color.BLACK, 12,
+                anchor_x="center", anchor_y="center")
+            self.progress_text.end()
+            self.progress_text.draw()
+
         preview_left = self.window.width - 320
         preview_bottom = self.window.height - 420
         preview_w = 300
@@ -744,11 +1898,14 @@ class Start_menu(arcade.View):
 
         if (button1_x <= x <= button1_x + button_width and
                 button1_y <= y <= button1_y + button_height):
-            game_view = MyGame(selected_hero=self.selected_hero)
-            self.window.show_view(game_view)
+            if self.loader.is_done():
+                self.start_game()
+            else:
+                self.start_requested = True
 
         if (button2_x <= x <= button2_x + button_width and
                 button2_y <= y <= button2_y + button_height):
+            self.start_requested = False
             hero_view = HeroSelectView(self)
             self.window.show_view(hero_view)
 
@@ -757,22 +1914,33 @@ class HeroSelectView(arcade.View):
     def __init__(self, start_view):
         super().__init__()
         self.start_view = start_view
-        self.map = load_texture_safe(MAP_IMAGE)
-        if self.map is None:
-            self.map = load_texture_safe("map.png")
+        self.map = None
         self.heroes = []
         for i in range(4):
-            tex = load_texture_safe(f"{ASSET_DIR}/hero{i + 1}.png")
-            if tex is None:
-                tex = load_texture_safe(f"hero{i + 1}.png")
             self.heroes.append({
-                "texture": tex,
+                "texture": None,
                 "str": 10 + i * 2,
                 "def": 5 + i,
                 "hp": HERO_MAX_HP + i * 20,
                 "desc": f"Описание героя {i + 1}."
             })
         self.selected = self.start_view.selected_hero
+        self.refresh_textures()
+
+    def refresh_textures(self):
+        if self.map is None:
+            self.map = cached_texture("map")
+        for i, hero in enumerate(self.heroes):
+            if hero["texture"] is None:
+                hero["texture"] = cached_texture(f"hero:{i + 1}")
+
+    def on_update(self, delta_time):
+        loader = self.start_view.loader
+        if loader.is_done():
+            return
+        loader.poll()
+        self.refresh_textures()
+        self.start_view.refresh_textures()
 
     def on_draw(self):
         self.clear()
@@ -927,14 +2095,12 @@ class HeroSelectView(arcade.View):
             self.window.show_view(self.start_view)
 
 
-class MyGame(arcade.View):
-    def __init__(self, selected_hero=0):
-        super().__init__()
-        self.map = load_texture_safe(MAP_IMAGE)
-        if self.map is None:
-            self.map = load_texture_safe("map.png")
-        hero_image = f"hero{selected_hero + 1}.png"
-        self.hero_sprite = Hero([f"{ASSET_DIR}/{hero_image}", hero_image], scale=0.25)
+class GameSimulation:
+    def __init__(self, selected_hero=0, view_width=800, view_height=500, seed=None):
+        self.seed = random.getrandbits(32) if seed is None else int(seed)
+        self.rng = random.Random(self.seed)
+        self.selected_hero = selected_hero
+        self.hero_sprite = Hero(f"hero:{selected_hero + 1}", scale=0.25)
         self.hero_sprite.max_hp = float(HERO_MAX_HP + selected_hero * 20)
         self.hero_sprite.hp = float(self.hero_sprite.max_hp)
         self.sprite_list = arcade.SpriteList()
@@ -949,8 +2115,9 @@ class MyGame(arcade.View):
         self.base_exp_per_kill = 5 + selected_hero * 5
         self.time_elapsed = 0.0
         self.wave = 1
-        self.view_width = 800
-        self.view_height = 500
+        self.view_width = view_width
+        self.view_height = view_height
+        self.spawn_extent = max(view_width, view_height)
         self.viewport_left = 0
         self.viewport_bottom = 0
         self.move_left = False
@@ -960,337 +2127,172 @@ class MyGame(arcade.View):
         self.bullet_list = arcade.SpriteList()
         self.enemy_list = arcade.SpriteList()
         self.exp_list = arcade.SpriteList()
+        self.orb_cells = {}
+        self.magnet_orbs = []
+        self.orb_magnet_radius = ORB_MAGNET_RADIUS
+        self.max_exp_orbs = MAX_EXP_ORBS
         self.enemy_bullet_list = arcade.SpriteList()
         self.boss_list = arcade.SpriteList()
         self.golem_list = arcade.SpriteList()
+        self.collision_grid = SpatialHash(COLLISION_CELL_SIZE)
+        self.enemy_grid = SpatialHash(COLLISION_CELL_SIZE)
+        self.enemy_entries_cache = None
+        self.enemy_index_ready = False
+        self.enemy_max_reach = 0.0
+        self.sprite_pool = SpritePool(POOL_MAX_FREE)
+        self.max_projectiles = MAX_ALIVE_PROJECTILES
+        self.enemy_arrays = EnemyArrays() if np is not None else None
+        self.vectorized_enemies = self.enemy_arrays is not None
+        self.ai_lod_distance = AI_LOD_DISTANCE
+        self.ai_lod_interval = AI_LOD_INTERVAL
+        self.lod_tick = 0
+        self.enemies_spawned = 0
+        self.status = StatusEffects()
+        self.spawn_queue = collections.deque()
+        self.spawn_points = collections.deque()
+        self.spawn_reserve = []
+        self.spawn_per_tick = SPAWN_PER_TICK
+        self.spawn_prewarm = True
         self.mobs_killed = 0
         self.boss2_spawned = False
         self.boss1_spawned = False
         self.game_over = False
         self.win = False
+        self.finished = False
         self.end_timer = 0.0
         self.shoot_timer = 0.0
         self.shot_cooldown = 0.18
         self.skill_selecting = False
         self.skills = []
-        self.skill_textures = []
-        for i in range(1, 10):
-            tex = load_texture_safe(f"{ASSET_DIR}/skils({i}).png")
-            if tex is None:
-                tex = load_texture_safe(f"{ASSET_DIR}/skils{i}.png")
-            if tex is None:
-                tex = load_texture_safe(f"skils({i}).png")
-            if tex is None:
-                tex = load_texture_safe(f"skils{i}.png")
-            self.skill_textures.append(tex)
-        self.skill_buttons = []
-        self.skill_hud_buttons = []
-        self.skill1_used = False
-        self.skill2_timer = 0.0
-        self.skill2_cooldown = 0.0
-        self.skill2_tick = 0.0
-        self.skill4_cooldown = 0.0
+        self.skill_cooldowns = array.array("d", [0.0] * SKILL_SLOTS)
+        self.skill_timers = array.array("d", [0.0] * SKILL_SLOTS)
+        self.skill_ticks = array.array("d", [0.0] * SKILL_SLOTS)
+        self.active_skills = set()
         self.lightning_active = False
         self.lightning_phase = 0
         self.lightning_radius = 0.0
+        self.lightning_x = 0.0
+        self.lightning_y = 0.0
         self.lightning_hit_out = set()
         self.lightning_hit_in = set()
+        self.separation_push = 0.0
 
-        self.skill5_mode = "passive"
-        self.skill5_active = False
-        self.skill5_timer = 0.0
-        self.skill5_cooldown = 0.0
-        self.skill5_tick = 0.0
         self.skill5_passive_hp_bonus = 0
         self.skill5_max_stacks = 50
         self.skill5_stacks = 0
         self.skill5_last_kill_time = 0
 
-        self.skill6_timer = 0.0
-        self.skill6_cooldown = 0.0
-        self.skill7_timer = 0.0
-        self.skill7_cooldown = 0.0
-        self.skill8_cooldown = 0.0
-        self.golem_life_timer = 0.0
         self.golem_hp = 0.0
         self.golem_armed = False
-        self.skill9_chance = 0.25
-
-        self.spawn_wave(self.wave)
 
-    def on_show_view(self):
-        if self.window:
-            self.view_width = self.window.width
-            self.view_height = self.window.height
-            self.update_camera(force=True)
-
-    def on_resize(self, width, height):
-        super().on_resize(width, height)
-        self.view_width = width
-        self.view_height = height
-        self.update_camera(force=True)
-
-    def on_draw(self):
-        self.clear()
-        offset_x = -self.viewport_left
-        offset_y = -self.viewport_bottom
-        rect = arcade.rect.XYWH(
-            MAP_WIDTH // 2 + offset_x,
-            MAP_HEIGHT // 2 + offset_y,
-            MAP_WIDTH,
-            MAP_HEIGHT,
+        self.enemy_target = self.hero_sprite
+        self.profiler = None
+        self.collision_checks = 0
+        self.sim_accumulator = 0.0
+        self.sim_alpha = 0.0
+        self.interpolation_layers = ()
+        self.previous_positions = {}
+        self.previous_viewport = None
+        self.sim_tick = 0
+        self.recording = None
+        self.replay = None
+        self.snapshot_executor = None
+        self.snapshot_future = None
+        self.autosave_path = None
+        self.autosave_at = SNAPSHOT_AUTOSAVE_INTERVAL
+        self.update_phases = (
+            ("cooldowns", self.update_timers),
+            ("effects", self.update_effects),
+            ("hero", self.update_hero),
+            ("projectiles", self.update_projectiles),
+            ("enemies", self.update_enemies),
+            ("separation", lambda delta_time: self.prevent_collisions()),
+            ("bullet_hits", self.resolve_bullet_hits),
+            ("orbs", self.collect_orbs),
+            ("boss", self.update_boss),
+            ("spawns", self.update_spawns),
+            ("progress", self.update_progress),
         )
-        if self.map is not None:
-            arcade.draw_texture_rect(self.map, rect)
-        else:
-            arcade.draw_lbwh_rectangle_filled(0, 0, self.view_width, self.view_height, arcade.color.DARK_GRAY)
-        self.draw_spritelist_with_offset(self.exp_list, offset_x, offset_y)
-        self.draw_spritelist_with_offset(self.enemy_list, offset_x, offset_y)
-        self.draw_spritelist_with_offset(self.golem_list, offset_x, offset_y)
-        self.draw_spritelist_with_offset(self.enemy_bullet_list, offset_x, offset_y)
-        self.draw_spritelist_with_offset(self.bullet_list, offset_x, offset_y)
-        self.draw_spritelist_with_offset(self.boss_list, offset_x, offset_y)
-        self.draw_spritelist_with_offset(self.sprite_list, offset_x, offset_y)
-        self.draw_world_effects(offset_x, offset_y)
-        self.draw_hud()
-        if self.skill_selecting:
-            self.draw_skill_select()
-        if self.game_over:
-            self.draw_end_screen("GAME OVER")
-        if self.win:
-            self.draw_end_screen("WIN")
-
-    def draw_world_effects(self, offset_x, offset_y):
-        hx = self.hero_sprite.center_x + offset_x
-        hy = self.hero_sprite.center_y + offset_y
-        if self.lightning_active:
-            arcade.draw_circle_outline(hx, hy, self.lightning_radius, arcade.color.YELLOW, 3)
-        if self.skill5_active and self.skill5_timer > 0 and self.skill5_mode == "active":
-            arcade.draw_circle_outline(hx, hy, 220, arcade.color.PURPLE, 3)
-
-        if self.skill7_timer > 0:
-            arcade.draw_circle_outline(hx, hy, 80, arcade.color.GRAY, 2)
-
-    def draw_spritelist_with_offset(self, spritelist, offset_x, offset_y):
-        if not spritelist:
-            return
-        for sprite in spritelist:
-            sprite.center_x += offset_x
-            sprite.center_y += offset_y
-        spritelist.draw()
-        for sprite in spritelist:
-            sprite.center_x -= offset_x
-            sprite.center_y -= offset_y
 
-    def draw_hud(self):
-        bar_width = 220
-        bar_height = 18
-        hp_max = float(self.hero_sprite.max_hp) if self.hero_sprite else 0.0
-        hp = float(self.hero_sprite.hp) if self.hero_sprite else 0.0
-        hp_ratio = hp / hp_max if hp_max else 0
-        exp_ratio = self.exp / self.exp_max if self.exp_max else 0
-
-        hp_x = 20
-        hp_y = self.view_height - 40
-        exp_x = 20
-        exp_y = self.view_height - 70
-
-        arcade.draw_lbwh_rectangle_outline(
-            hp_x, hp_y, bar_width, bar_height, arcade.color.BLACK
-        )
-        arcade.draw_lbwh_rectangle_filled(
-            hp_x, hp_y, int(bar_width * hp_ratio), bar_height, arcade.color.RED
-        )
-        arcade.draw_text(
-            f"HP: {int(hp)}/{int(hp_max)}",
-            hp_x + bar_width + 10,
-            hp_y + 2,
-            arcade.color.BLACK,
-            12,
-        )
+        self.spawn_wave(self.wave)
 
-        arcade.draw_lbwh_rectangle_outline(
-            exp_x, exp_y, bar_width, bar_height, arcade.color.BLACK
-        )
-        arcade.draw_lbwh_rectangle_filled(
-            exp_x, exp_y, int(bar_width * exp_ratio), bar_height, arcade.color.BLUE
-        )
-        arcade.draw_text(
-            f"EXP: {int(self.exp)}/{int(self.exp_max)}",
-            exp_x + bar_width + 10,
-            exp_y + 2,
-            arcade.color.BLACK,
-            12,
-        )
+    def update_movement(self):
+        dx = 0
+        dy = 0
+        if self.move_left and not self.move_right:
+            dx = -self.speed
+        elif self.move_right and not self.move_left:
+            dx = self.speed
+        if self.move_up and not self.move_down:
+            dy = self.speed
+        elif self.move_down and not self.move_up:
+            dy = -self.speed
+        self.hero_sprite.change_x = dx
+        self.hero_sprite.change_y = dy
 
-        minutes = int(self.time_elapsed) // 60
-        seconds = int(self.time_elapsed) % 60
-        arcade.draw_text(
-            f"Время: {minutes:02d}:{seconds:02d}",
-            self.view_width - 180,
-            self.view_height - 40,
-            arcade.color.BLACK,
-            14,
-        )
-        arcade.draw_text(
-            f"Волна: {self.wave}",
-            self.view_width - 180,
-            self.view_height - 70,
-            arcade.color.BLACK,
-            14,
-        )
-        arcade.draw_text(
-            f"LVL: {self.level}",
-            20,
-            self.view_height - 100,
-            arcade.color.BLACK,
-            14,
-        )
-        arcade.draw_text(
-            f"DMG: {int(self.damage)}",
-            20,
-            self.view_height - 120,
-            arcade.color.BLACK,
-            14,
-        )
-        arcade.draw_text(
-            f"KILLS: {self.mobs_killed}",
-            20,
-            self.view_height - 140,
-            arcade.color.BLACK,
-            14,
-        )
-        if self.boss_list:
-            boss = self.boss_list[0]
-            boss_hp = getattr(boss, "hp", 0)
-            boss_hp_max = getattr(boss, "max_hp", getattr(boss, "hp_max", boss_hp))
-            ratio = boss_hp / boss_hp_max if boss_hp_max else 0
-            w = 360
-            h = 16
-            x = self.view_width // 2 - w // 2
-            y = self.view_height - 30
-            arcade.draw_lbwh_rectangle_outline(x, y, w, h, arcade.color.BLACK)
-            arcade.draw_lbwh_rectangle_filled(x, y, int(w * ratio), h, arcade.color.BLUE)
-            arcade.draw_text(
-                f"BOSS: {int(boss_hp)}/{int(boss_hp_max)}",
-                x + w // 2,
-                y + h // 2,
-                arcade.color.WHITE,
-                12,
-                anchor_x="center",
-                anchor_y="center",
-            )
-        self.draw_skills_bar()
+    def set_movement(self, left=False, right=False, up=False, down=False):
+        self.move_left = bool(left)
+        self.move_right = bool(right)
+        self.move_up = bool(up)
+        self.move_down = bool(down)
+        self.update_movement()
 
-    def draw_skills_bar(self):
-        if not self.skills:
+    def fire_at(self, world_x, world_y):
+        if self.game_over or self.win or self.skill_selecting:
             return
-        icon = 44
-        gap = 10
-        skills_sorted = sorted(self.skills)
-        total_w = len(skills_sorted) * icon + (len(skills_sorted) - 1) * gap
-        x = self.view_width - total_w - 20
-        y = 20
-        self.skill_hud_buttons = []
-        for skill_id in skills_sorted:
-            self.skill_hud_buttons.append((skill_id, x, y, icon, icon))
-            tex = self.skill_textures[skill_id - 1] if (skill_id - 1) < len(self.skill_textures) else None
-            if tex is not None:
-                rct = arcade.rect.XYWH(x + icon // 2, y + icon // 2, icon, icon)
-                arcade.draw_texture_rect(tex, rct)
-            else:
-                arcade.draw_lbwh_rectangle_filled(x, y, icon, icon, arcade.color.LIGHT_GRAY)
-                arcade.draw_lbwh_rectangle_outline(x, y, icon, icon, arcade.color.BLACK)
-                arcade.draw_text(str(skill_id), x + icon // 2, y + icon // 2, arcade.color.BLACK, 18,
-                                 anchor_x="center", anchor_y="center", bold=True)
-            arcade.draw_lbwh_rectangle_outline(x, y, icon, icon, arcade.color.BLACK)
-            arcade.draw_text(str(skill_id), x + 6, y + 4, arcade.color.BLACK, 12, bold=True)
-
-            cd = 0.0
-            active = 0.0
-            if skill_id == 1:
-                if self.skill1_used:
-                    cd = 999.0
-            elif skill_id == 2:
-                cd = self.skill2_cooldown
-                active = self.skill2_timer
-            elif skill_id == 4:
-                cd = self.skill4_cooldown
-                active = 1.0 if self.lightning_active else 0.0
-            elif skill_id == 5:
-                cd = self.skill5_cooldown
-                active = self.skill5_timer
-                mode_text = "A" if self.skill5_mode == "active" else "P"
-                arcade.draw_text(mode_text, x + icon - 8, y + icon - 8, arcade.color.BLACK, 10,
-                                 anchor_x="center", anchor_y="center", bold=True)
-                if self.skill5_mode == "passive" and self.skill5_stacks > 0:
-                    arcade.draw_text(f"{self.skill5_stacks}", x + icon // 2, y - 14, arcade.color.BLACK, 10,
-                                     anchor_x="center", bold=True)
-            elif skill_id == 6:
-                cd = self.skill6_cooldown
-                active = self.skill6_timer
-            elif skill_id == 7:
-                cd = self.skill7_cooldown
-                active = self.skill7_timer
-            elif skill_id == 8:
-                cd = self.skill8_cooldown
-
-            if skill_id == 8 and self.golem_armed:
-                arcade.draw_text("ARM", x + icon // 2, y + icon + 4, arcade.color.BLACK, 10,
-                                 anchor_x="center", bold=True)
-            if active > 0 and skill_id in (2, 5, 6, 7):
-                arcade.draw_text(f"{active:.0f}s", x + icon // 2, y - 14, arcade.color.BLACK, 10,
-                                 anchor_x="center", bold=True)
-            if skill_id == 4 and self.lightning_active:
-                arcade.draw_text("ON", x + icon // 2, y - 14, arcade.color.BLACK, 10,
-                                 anchor_x="center", bold=True)
-            if skill_id == 8 and self.golem_list:
-                arcade.draw_text(f"HP {int(self.golem_hp)}", x + icon // 2, y - 14, arcade.color.BLACK, 10,
-                                 anchor_x="center", bold=True)
-            if cd > 0 and cd < 900:
-                arcade.draw_text(f"CD {cd:.0f}", x + icon // 2, y + icon + 4, arcade.color.BLACK, 10,
-                                 anchor_x="center", bold=True)
-            if cd >= 900:
-                arcade.draw_text("USED", x + icon // 2, y + icon + 4, arcade.color.BLACK, 10,
-                                 anchor_x="center", bold=True)
-            x += icon + gap
+        if self.shoot_timer < self.shot_cooldown:
+            return
+        self.shoot_timer = 0.0
+        self.spawn_bullet(self.hero_sprite.center_x, self.hero_sprite.center_y, world_x, world_y, self.damage)
 
-    def on_key_press(self, key, modifiers):
-        if self.game_over or self.win:
-            if key in (arcade.key.ESCAPE, arcade.key.ENTER):
-                self.close_game()
+    def choose_skill(self, idx):
+        if not self.skill_selecting:
             return
-        if self.skill_selecting:
+        if idx in self.skills:
+            return
+        if len(self.skills) >= MAX_SKILLS:
+            return
+        self.skills.append(idx)
+        self.apply_skill(idx)
+        self.skill_selecting = False
+        self.gain_exp(0)
+
+    def send_input(self, event):
+        if self.replay is not None:
             return
-        num = self.key_to_number(key)
-        if num is not None:
-            self.activate_skill(num)
+        if self.recording is not None:
+            self.recording.record(self.sim_tick, event)
+        self.apply_input(event)
+
+    def apply_input(self, event):
+        kind = event[0]
+        if kind == "key":
+            self.handle_key(event[1], bool(event[2]))
+        elif kind == "click":
+            self.handle_click(event[1], event[2], event[3])
+        elif kind == "skill":
+            self.activate_skill(event[1])
+        elif kind == "choose":
+            self.choose_skill(event[1])
+        elif kind == "view":
+            self.spawn_extent = max(event[1], event[2])
+
+    def handle_key(self, key, pressed):
+        if self.game_over or self.win or self.skill_selecting:
             return
+        if pressed:
+            num = self.key_to_number(key)
+            if num is not None:
+                self.activate_skill(num)
+                return
         if key in (arcade.key.UP, arcade.key.W):
-            self.move_up = True
+            self.move_up = pressed
         elif key in (arcade.key.DOWN, arcade.key.S):
-            self.move_down = True
+            self.move_down = pressed
         elif key in (arcade.key.LEFT, arcade.key.A):
-            self.move_left = True
+            self.move_left = pressed
         elif key in (arcade.key.RIGHT, arcade.key.D):
-            self.move_right = True
-        self.update_movement()
-
-    def on_key_release(self, key, modifiers):
-        if self.game_over or self.win:
-            return
-        if self.skill_selecting:
-            return
-        if key in (arcade.key.UP, arcade.key.W, arcade.key.DOWN, arcade.key.S):
-            if key in (arcade.key.UP, arcade.key.W):
-                self.move_up = False
-            if key in (arcade.key.DOWN, arcade.key.S):
-                self.move_down = False
-        if key in (arcade.key.LEFT, arcade.key.A, arcade.key.RIGHT, arcade.key.D):
-            if key in (arcade.key.LEFT, arcade.key.A):
-                self.move_left = False
-            if key in (arcade.key.RIGHT, arcade.key.D):
-                self.move_right = False
+            self.move_right = pressed
         self.update_movement()
 
     def key_to_number(self, key):
@@ -1305,19 +2307,192 @@ class MyGame(arcade.View):
                 return i
         return None
 
-    def update_movement(self):
-        dx = 0
-        dy = 0
-        if self.move_left and not self.move_right:
-            dx = -self.speed
-        elif self.move_right and not self.move_left:
-            dx = self.speed
-        if self.move_up and not self.move_down:
-            dy = self.speed
-        elif self.move_down and not self.move_up:
-            dy = -self.speed
-        self.hero_sprite.change_x = dx
-        self.hero_sprite.change_y = dy
+    def handle_click(self, button, world_x, world_y):
+        if self.game_over or self.win or self.skill_selecting:
+            return
+        if self.golem_armed and button == arcade.MOUSE_BUTTON_LEFT:
+            self.try_summon_golem(world_x, world_y)
+            return
+        if button == arcade.MOUSE_BUTTON_RIGHT:
+            self.try_summon_golem(world_x, world_y)
+            return
+        if button != arcade.MOUSE_BUTTON_LEFT:
+            return
+        self.fire_at(world_x, world_y)
+
+    def start_recording(self):
+        self.recording = Replay(self.seed, self.selected_hero, self.view_width, self.view_height)
+        return self.recording
+
+    def stop_recording(self, path=None):
+        recording = self.recording
+        self.recording = None
+        if recording is None:
+            return None
+        recording.ticks = self.sim_tick
+        if path is not None:
+            recording.save(path)
+        return recording
+
+    def snapshot_refs(self):
+        refs = {self.hero_sprite: 0}
+        for entity in self.enemy_list:
+            refs[entity] = len(refs)
+        for entity in self.boss_list:
+            refs[entity] = len(refs)
+        return refs
+
+    def capture_snapshot(self):
+        if self.enemy_arrays is not None:
+            self.enemy_arrays.store_pending()
+        snapshot = Snapshot(self.selected_hero, self.seed, self.view_width, self.view_height, self.sim_tick)
+        snapshot.scalar_values = tuple(getattr(self, name) for name, _ in SNAPSHOT_SCALARS)
+        hero = self.hero_sprite
+        snapshot.hero_values = (hero.center_x, hero.center_y, float(hero.hp), float(hero.max_hp))
+        active = sum(1 << skill_id for skill_id in self.active_skills)
+        snapshot.skill_values = (
+            tuple(self.skill_cooldowns) + tuple(self.skill_timers) + tuple(self.skill_ticks) + (active,)
+        )
+        version, words, gauss = self.rng.getstate()
+        snapshot.rng_values = (version,) + tuple(words) + (gauss is not None, gauss or 0.0)
+        snapshot.skills = list(self.skills)
+        snapshot.pending_spawns = len(self.spawn_queue)
+        kinds = {cls: (code, attribute) for code, (cls, attribute) in enumerate(SNAPSHOT_ENEMY_KINDS)}
+        for source, target in ((self.enemy_list, snapshot.enemies), (self.boss_list, snapshot.bosses)):
+            for enemy in source:
+                code, attribute = kinds[type(enemy)]
+                target.append((
+                    code, int(getattr(enemy, "spawn_level", self.wave)), enemy.center_x, enemy.center_y,
+                    float(enemy.hp), float(enemy.max_hp), float(enemy.damage), float(enemy.base_speed),
+                    float(getattr(enemy, attribute, 0.0)) if attribute else 0.0, int(enemy.lod_slot or 0),
+                    min(255, int(getattr(enemy, "lod_pending", 0))),
+                ))
+        refs = self.snapshot_refs()
+        for code, kind in enumerate(self.status.types):
+            for entity, entry in self.status.tables[kind].items():
+                if entity in refs:
+                    snapshot.effects.append((refs[entity], code) + tuple(entry))
+        kinds = {cls.__name__: code for code, cls in enumerate(SNAPSHOT_PROJECTILE_KINDS)}
+        for source, target in ((self.bullet_list, snapshot.bullets), (self.enemy_bullet_list, snapshot.enemy_bullets)):
+            for bullet in source:
+                target.append((
+                    kinds.get(getattr(bullet, "pool_kind", None), len(SNAPSHOT_PROJECTILE_KINDS)),
+                    bullet.center_x, bullet.center_y, bullet.change_x, bullet.change_y,
+                    float(getattr(bullet, "damage", 10)), bullet.angle,
+                ))
+        for orb in self.exp_list:
+            cell = getattr(orb, "orb_cell", None)
+            cell_x, cell_y = cell if cell is not None else (-1, -1)
+            snapshot.orbs.append((orb.center_x, orb.center_y, int(orb.value), cell_x, cell_y,
+                                  cell is not None, bool(orb.magnet)))
+        if self.golem_list:
+            golem = self.golem_list[0]
+            snapshot.golem_values = (1, golem.center_x, golem.center_y)
+        snapshot.lightning_hits = tuple(
+            [refs[entity] for entity in hits if entity in refs]
+            for hits in (self.lightning_hit_out, self.lightning_hit_in)
+        )
+        return snapshot
+
+    def save_snapshot(self, path):
+        snapshot = self.capture_snapshot()
+        if self.snapshot_executor is None:
+            self.snapshot_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.snapshot_future = self.snapshot_executor.submit(snapshot.save, path)
+        return self.snapshot_future
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        game = cls(snapshot.selected_hero, snapshot.view_width, snapshot.view_height, snapshot.seed)
+        game.restore_snapshot(snapshot)
+        return game
+
+    def restore_snapshot(self, snapshot):
+        for layer in (self.bullet_list, self.enemy_bullet_list, self.exp_list):
+            for sprite in list(layer):
+                self.sprite_pool.release(sprite)
+        for layer in (self.enemy_list, self.boss_list, self.golem_list):
+            for sprite in list(layer):
+                sprite.remove_from_sprite_lists()
+        self.status = StatusEffects()
+        self.spawn_queue.clear()
+        self.spawn_points.clear()
+        self.spawn_reserve.clear()
+        self.orb_cells = {}
+        self.magnet_orbs = []
+        for (name, _), value in zip(SNAPSHOT_SCALARS, snapshot.scalar_values):
+            setattr(self, name, value)
+        self.sim_tick = snapshot.sim_tick
+        hero = self.hero_sprite
+        hero.center_x, hero.center_y, hero.hp, hero.max_hp = snapshot.hero_values
+        values = snapshot.skill_values
+        self.skill_cooldowns = array.array("d", values[:SKILL_SLOTS])
+        self.skill_timers = array.array("d", values[SKILL_SLOTS:SKILL_SLOTS * 2])
+        self.skill_ticks = array.array("d", values[SKILL_SLOTS * 2:SKILL_SLOTS * 3])
+        self.active_skills = {skill_id for skill_id in range(SKILL_SLOTS) if values[-1] >> skill_id & 1}
+        rng = snapshot.rng_values
+        self.rng.setstate((rng[0], tuple(rng[1:626]), rng[627] if rng[626] else None))
+        self.skills = list(snapshot.skills)
+        self.set_movement()
+        self.spawn_queue.extend([None] * snapshot.pending_spawns)
+        for source, target in ((snapshot.enemies, self.enemy_list), (snapshot.bosses, self.boss_list)):
+            for code, level, x, y, hp, max_hp, damage, speed, cooldown, lod_slot, lod_pending in source:
+                cls, attribute = SNAPSHOT_ENEMY_KINDS[code]
+                enemy = cls(x, y, hero, level)
+                enemy.spawn_level = level
+                enemy.hp = hp
+                enemy.max_hp = max_hp
+                enemy.damage = int(damage)
+                enemy.base_speed = speed
+                if attribute:
+                    setattr(enemy, attribute, cooldown)
+                enemy.projectile_pool = self.sprite_pool
+                enemy.lod_slot = lod_slot
+                enemy.lod_pending = lod_pending
+                if target is self.boss_list:
+                    enemy.is_final_boss = cls is BossDragon
+                target.append(enemy)
+        entities = [hero] + list(self.enemy_list) + list(self.boss_list)
+        kinds = tuple(self.status.types)
+        for ref, code, *entry in snapshot.effects:
+            self.status.restore(entities[ref], kinds[code], entry)
+        for source, target in ((snapshot.bullets, self.bullet_list), (snapshot.enemy_bullets, self.enemy_bullet_list)):
+            for code, x, y, change_x, change_y, damage, angle in source:
+                if code < len(SNAPSHOT_PROJECTILE_KINDS):
+                    bullet = self.sprite_pool.spawn(SNAPSHOT_PROJECTILE_KINDS[code], x, y, x + change_x, y + change_y)
+                else:
+                    bullet = self.sprite_pool.take("enemy_bullet")
+                    if bullet is None:
+                        bullet = make_solid_sprite(12, 12, arcade.color.BLUE)
+                        bullet.pool_kind = "enemy_bullet"
+                    bullet.center_x = x
+                    bullet.center_y = y
+                bullet.change_x = change_x
+                bullet.change_y = change_y
+                bullet.damage = int(damage)
+                bullet.angle = angle
+                target.append(bullet)
+        for x, y, value, cell_x, cell_y, has_cell, magnet in snapshot.orbs:
+            orb = self.new_orb(x, y, value, (cell_x, cell_y) if has_cell and not magnet else None)
+            if magnet:
+                orb.magnet = True
+                self.magnet_orbs.append(orb)
+        present, x, y = snapshot.golem_values
+        if present:
+            self.golem_list.append(self.make_golem(x, y))
+        hits_out, hits_in = snapshot.lightning_hits
+        self.lightning_hit_out = {entities[ref] for ref in hits_out}
+        self.lightning_hit_in = {entities[ref] for ref in hits_in}
+        self.invalidate_enemy_index()
+        self.previous_positions = {}
+        self.autosave_at = self.time_elapsed + SNAPSHOT_AUTOSAVE_INTERVAL
+        self.update_camera(force=True)
+
+    def play_replay(self, replay):
+        replay.rewind()
+        self.recording = None
+        self.replay = replay
+
 
     def base_heal_on_kill(self):
         return 6 + (self.wave // 10) * 3
@@ -1331,7 +2506,7 @@ class MyGame(arcade.View):
             dmg = dmg - float(self.defence)
         if dmg < 1:
             dmg = 1.0
-        if can_reduce and 6 in self.skills and self.skill6_timer > 0:
+        if can_reduce and self.skill_timers[6] > 0:
             dmg *= 0.9
         self.hero_sprite.hp -= dmg
         return dmg
@@ -1344,7 +2519,7 @@ class MyGame(arcade.View):
             self.golem_hp = 0
             for s in list(self.golem_list):
                 s.remove_from_sprite_lists()
-            self.golem_life_timer = 0.0
+            self.skill_timers[8] = 0.0
 
     def keep_in_bounds(self, entity):
         r = getattr(entity, "collision_radius", None)
@@ -1365,52 +2540,159 @@ class MyGame(arcade.View):
         if entity.center_y + r >= MAP_HEIGHT:
             entity.center_y = MAP_HEIGHT - r
 
+    def body_radius(self, entity):
+        r = getattr(entity, "collision_radius", None)
+        if r is None:
+            r = max(getattr(entity, "width", 0), getattr(entity, "height", 0)) / 2
+        return float(r)
+
+    def collides(self, a, b):
+        if self.profiler is not None:
+            self.collision_checks += 1
+        return arcade.check_for_collision(a, b)
+
+    def collides_with_list(self, sprite, sprite_list):
+        if self.profiler is not None:
+            self.collision_checks += len(sprite_list)
+        return arcade.check_for_collision_with_list(sprite, sprite_list)
+
+    def sprite_reach(self, sprite):
+        reach = getattr(sprite, "hit_reach", None)
+        if reach is None:
+            reach = max(float(getattr(sprite, "collision_radius", 0.0)), math.hypot(sprite.width, sprite.height) * 0.5)
+            sprite.hit_reach = reach
+        return reach
+
+    def projectile_touches(self, bullet, bullet_reach, target, target_reach):
+        dx = target.center_x - bullet.center_x
+        dy = target.center_y - bullet.center_y
+        reach = bullet_reach + target_reach
+        if dx * dx + dy * dy > reach * reach:
+            return False
+        return self.collides(bullet, target)
+
+    def invalidate_enemy_index(self):
+        self.enemy_entries_cache = None
+        self.enemy_index_ready = False
+
+    def enemy_entries(self):
+        entries = self.enemy_entries_cache
+        if entries is None:
+            entries = []
+            for enemy in self.enemy_list:
+                x, y = enemy.position
+                entries.append((enemy, x, y, self.sprite_reach(enemy)))
+            self.enemy_entries_cache = entries
+        return entries
+
+    def enemy_index(self):
+        grid = self.enemy_grid
+        if not self.enemy_index_ready:
+            grid.clear()
+            max_reach = 0.0
+            for entry in self.enemy_entries():
+                grid.insert_point(entry, entry[1], entry[2])
+                if entry[3] > max_reach:
+                    max_reach = entry[3]
+            self.enemy_max_reach = max_reach
+            self.enemy_index_ready = True
+        return grid
+
+    def enemies_in_annulus(self, x, y, inner, outer):
+        if outer < 0 or not self.enemy_list:
+            return []
+        inner_sq = inner * inner if inner > 0 else -1.0
+        outer_sq = outer * outer
+        found = []
+        for enemy, ex, ey, _ in self.enemy_index().query_ring(x, y, inner, outer):
+            if not enemy.sprite_lists:
+                continue
+            dx = ex - x
+            dy = ey - y
+            dist_sq = dx * dx + dy * dy
+            if inner_sq <= dist_sq <= outer_sq:
+                found.append(enemy)
+        return found
+
+    def enemies_in_radius(self, x, y, radius):
+        return self.enemies_in_annulus(x, y, 0.0, radius)
+
+    def nearest_enemies(self, x, y, count=1, max_radius=None):
+        if count <= 0 or not self.enemy_list:
+            return []
+        limit = float(max_radius) if max_radius is not None else math.hypot(MAP_WIDTH, MAP_HEIGHT)
+        grid = self.enemy_index()
+        radius = min(grid.cell_size, limit)
+        while True:
+            found = []
+            for enemy, ex, ey, _ in grid.query(x, y, radius):
+                if not enemy.sprite_lists:
+                    continue
+                dist_sq = (ex - x) ** 2 + (ey - y) ** 2
+                if dist_sq <= radius * radius:
+                    found.append((dist_sq, enemy))
+            if len(found) >= count or radius >= limit:
+                break
+            radius = min(radius * 2.0, limit)
+        found.sort(key=lambda item: item[0])
+        return [enemy for _, enemy in found[:count]]
+
+    def enemies_touching(self, sprite):
+        reach = self.sprite_reach(sprite)
+        x, y = sprite.position
+        touching = []
+        grid = self.enemy_index()
+        for enemy, ex, ey, enemy_reach in grid.query(x, y, reach + self.enemy_max_reach):
+            limit = reach + enemy_reach
+            if (ex - x) ** 2 + (ey - y) ** 2 > limit * limit:
+                continue
+            if enemy.sprite_lists and self.collides(enemy, sprite):
+                touching.append(enemy)
+        return touching
+
     def prevent_collisions(self):
-        entities = []
-        entities.extend(list(self.enemy_list))
-        entities.extend(list(self.boss_list))
-        entities.extend(list(self.golem_list))
-        entities.append(self.hero_sprite)
-        if len(entities) > 140:
-            return
-        for i in range(len(entities)):
-            e1 = entities[i]
-            r1 = getattr(e1, "collision_radius", None)
-            if r1 is None:
-                r1 = max(getattr(e1, "width", 0), getattr(e1, "height", 0)) / 2
-            for j in range(i + 1, len(entities)):
-                e2 = entities[j]
-                r2 = getattr(e2, "collision_radius", None)
-                if r2 is None:
-                    r2 = max(getattr(e2, "width", 0), getattr(e2, "height", 0)) / 2
-                dx = e2.center_x - e1.center_x
-                dy = e2.center_y - e1.center_y
-                dist = math.hypot(dx, dy)
-                min_sep = float(r1) + float(r2) + 4.0
-                if dist < min_sep and dist > 0:
-                    overlap = min_sep - dist
-                    move_x = (dx / dist) * overlap * 0.5
-                    move_y = (dy / dist) * overlap * 0.5
-                    e1.center_x -= move_x
-                    e1.center_y -= move_y
-                    e2.center_x += move_x
-                    e2.center_y += move_y
-                    self.keep_in_bounds(e1)
-                    self.keep_in_bounds(e2)
+        self.invalidate_enemy_index()
+        grid = self.collision_grid
+        grid.clear()
+        for group in (self.enemy_list, self.boss_list, self.golem_list):
+            for entity in group:
+                grid.insert(entity, entity.center_x, entity.center_y, self.body_radius(entity) + 2.0)
+        hero = self.hero_sprite
+        grid.insert(hero, hero.center_x, hero.center_y, self.body_radius(hero) + 2.0)
+        pushed = {}
+        for e1, r1, e2, r2 in grid.pairs():
+            dx = e2.center_x - e1.center_x
+            dy = e2.center_y - e1.center_y
+            dist = math.hypot(dx, dy)
+            min_sep = r1 + r2
+            if dist < min_sep and dist > 0:
+                overlap = min_sep - dist
+                move_x = (dx / dist) * overlap * 0.5
+                move_y = (dy / dist) * overlap * 0.5
+                pushed[e1] = pushed.get(e1, 0.0) + overlap * 0.5
+                pushed[e2] = pushed.get(e2, 0.0) + overlap * 0.5
+                e1.center_x -= move_x
+                e1.center_y -= move_y
+                e2.center_x += move_x
+                e2.center_y += move_y
+                self.keep_in_bounds(e1)
+                self.keep_in_bounds(e2)
+        self.separation_push = max(pushed.values()) if pushed else 0.0
 
     def kill_enemy(self, enemy):
         x = enemy.center_x
         y = enemy.center_y
         enemy.remove_from_sprite_lists()
+        self.status.discard(enemy)
         self.mobs_killed += 1
         value = int(self.base_exp_per_kill * self.exp_multiplier)
         self.spawn_exp_orb(x, y, value)
 
-        if 2 in self.skills and self.skill2_timer > 0:
+        if self.skill_timers[2] > 0:
             heal = self.base_heal_on_kill()
             self.heal_player(heal)
 
-        if 5 in self.skills and self.skill5_mode == "passive":
+        if 5 in self.skills and self.skill_timers[5] <= 0:
             current_time = self.time_elapsed
             if current_time - self.skill5_last_kill_time <= 10.0:
                 self.skill5_stacks = min(self.skill5_stacks + 1, self.skill5_max_stacks)
@@ -1434,6 +2716,7 @@ class MyGame(arcade.View):
         if boss.hp <= 0:
             is_final = bool(getattr(boss, "is_final_boss", False))
             boss.remove_from_sprite_lists()
+            self.status.discard(boss)
             if is_final:
                 self.win = True
                 self.end_timer = 0.0
@@ -1441,80 +2724,50 @@ class MyGame(arcade.View):
     def apply_slow_to_boss(self, factor, duration):
         if not self.boss_list:
             return
-        boss = self.boss_list[0]
-        boss.speed_multiplier = min(getattr(boss, "speed_multiplier", 1.0), float(factor))
-        boss.slow_timer = max(getattr(boss, "slow_timer", 0.0), float(duration))
+        self.status.apply(self.boss_list[0], "slow", duration, factor)
 
     def maybe_proc_skill9(self):
         if 9 not in self.skills:
             return
-        if random.random() < self.skill9_chance:
-            self.skill2_cooldown = 0.0
-            self.skill4_cooldown = 0.0
-            self.skill5_cooldown = 0.0
-            self.skill6_cooldown = 0.0
-            self.skill7_cooldown = 0.0
-            self.skill8_cooldown = 0.0
+        if self.rng.random() < SKILLS[9].chance:
+            cooldowns = self.skill_cooldowns
+            for skill_id in self.skills:
+                if SKILLS[skill_id].resettable:
+                    cooldowns[skill_id] = 0.0
 
     def activate_skill(self, num):
         if num not in self.skills:
             return
-        if num == 2:
-            if self.skill2_cooldown > 0:
-                return
-            heal = float(self.hero_sprite.max_hp) * 0.5
-            self.hero_sprite.hp = min(self.hero_sprite.hp + heal, self.hero_sprite.max_hp)
-            self.skill2_timer = 10.0
-            self.skill2_tick = 0.0
-            self.skill2_cooldown = 25.0
-            self.maybe_proc_skill9()
-        elif num == 4:
-            if self.skill4_cooldown > 0 or self.lightning_active:
-                return
-            self.lightning_active = True
-            self.lightning_phase = 0
-            self.lightning_radius = 0.0
-            self.lightning_hit_out = set()
-            self.lightning_hit_in = set()
-            self.skill4_cooldown = 14.0
-            self.maybe_proc_skill9()
-        elif num == 5:
-            if self.skill5_cooldown > 0:
-                return
+        spec = SKILLS.get(num)
+        if spec is None or not spec.manual or not spec.ready(self):
+            return
+        spec.activate(self)
 
-            if self.skill5_mode == "active":
-                self.skill5_mode = "passive"
-                self.skill5_active = False
-                self.skill5_timer = 0.0
-            else:
-                self.skill5_mode = "active"
-                self.skill5_active = True
-                self.skill5_timer = 20.0
-                self.skill5_tick = 0.0
-
-            self.skill5_cooldown = 5.0
-            self.maybe_proc_skill9()
-        elif num == 6:
-            if self.skill6_cooldown > 0 or self.skill6_timer > 0:
-                return
-            self.skill6_timer = 20.0
-            self.skill6_cooldown = 50.0
-            self.maybe_proc_skill9()
-        elif num == 7:
-            if self.skill7_cooldown > 0 or self.skill7_timer > 0:
-                return
-            self.skill7_timer = 15.0
-            self.skill7_cooldown = 60.0
-            self.maybe_proc_skill9()
-        elif num == 8:
-            if self.skill8_cooldown > 0:
-                return
-            if self.golem_list:
-                return
-            self.golem_armed = True
+    def start_skill(self, spec, running=True):
+        self.skill_cooldowns[spec.skill_id] = spec.cooldown
+        if running:
+            self.active_skills.add(spec.skill_id)
+        self.maybe_proc_skill9()
+
+    def stop_skill(self, skill_id):
+        if skill_id in self.active_skills:
+            self.active_skills.discard(skill_id)
+            SKILLS[skill_id].expire(self)
+
+    def update_skills(self, delta_time):
+        cooldowns = self.skill_cooldowns
+        for skill_id in self.skills:
+            if cooldowns[skill_id] > 0:
+                cooldowns[skill_id] = max(0.0, cooldowns[skill_id] - delta_time)
+            SKILLS[skill_id].idle(self, delta_time)
+        if not self.active_skills:
+            return
+        for skill_id in sorted(self.active_skills):
+            if not SKILLS[skill_id].tick(self, delta_time):
+                self.stop_skill(skill_id)
 
     def update_skill5_passive_bonus(self):
-        if self.skill5_mode != "passive":
+        if self.skill_timers[5] > 0:
             return
 
         new_bonus = self.skill5_stacks * 20
@@ -1526,21 +2779,18 @@ class MyGame(arcade.View):
         self.skill5_passive_hp_bonus = new_bonus
 
     def update_aura(self, delta_time):
-        if self.skill5_timer <= 0 or self.skill5_mode != "active":
-            return
-        self.skill5_tick += delta_time
-        while self.skill5_tick >= 1.0 and self.skill5_timer > 0:
-            self.skill5_tick -= 1.0
+        ticks = self.skill_ticks
+        ticks[5] += delta_time
+        while ticks[5] >= 1.0:
+            ticks[5] -= 1.0
             hx = self.hero_sprite.center_x
             hy = self.hero_sprite.center_y
 
-            for enemy in list(self.enemy_list):
-                dist = math.hypot(enemy.center_x - hx, enemy.center_y - hy)
-                if dist <= 220:
-                    damage = 10 + (self.skill5_stacks * 0.5)
-                    self.damage_enemy(enemy, damage)
-                    if hasattr(enemy, "apply_slow"):
-                        enemy.apply_slow(0.9, 1.2)
+            for enemy in self.enemies_in_radius(hx, hy, 220):
+                damage = 10 + (self.skill5_stacks * 0.5)
+                self.damage_enemy(enemy, damage)
+                if enemy.hp > 0:
+                    self.status.apply(enemy, "slow", 1.2, 0.9)
 
             if self.boss_list:
                 boss = self.boss_list[0]
@@ -1552,41 +2802,42 @@ class MyGame(arcade.View):
 
             self.damage_player(15, use_defence=False, can_reduce=False)
 
-    def try_summon_golem(self, x, y):
+    def try_summon_golem(self, world_x, world_y):
         if 8 not in self.skills:
             return
-        if self.skill8_cooldown > 0:
-            return
-        if self.golem_list:
+        spec = SKILLS[8]
+        if not spec.ready(self):
             return
         self.golem_armed = False
-        world_x = x + self.viewport_left
-        world_y = y + self.viewport_bottom
+        self.golem_list.append(self.make_golem(world_x, world_y))
+        self.golem_hp = 500.0
+        self.skill_timers[8] = spec.duration
+        self.start_skill(spec)
+
+    def make_golem(self, x, y):
         golem = make_sprite_from_candidates(
-            [f"{ASSET_DIR}/skils8.png"],
+            "golem",
             scale=2,
             fallback_w=90,
             fallback_h=90,
             fallback_color=arcade.color.ORANGE,
         )
-        golem.center_x = world_x
-        golem.center_y = world_y
+        golem.center_x = x
+        golem.center_y = y
         try:
             golem.collision_radius = 55
         except Exception:
             pass
-        self.golem_list.append(golem)
-        self.golem_hp = 500.0
-        self.golem_life_timer = 60.0
-        self.skill8_cooldown = 90.0
-        self.maybe_proc_skill9()
+        return golem
 
     def update_lightning(self, delta_time):
         if not self.lightning_active:
             return
         max_r = 780.0
         speed = 520.0
-        if self.lightning_phase == 0:
+        previous_r = self.lightning_radius
+        expanding = self.lightning_phase == 0
+        if expanding:
             self.lightning_radius += speed * delta_time
             if self.lightning_radius >= max_r:
                 self.lightning_radius = max_r
@@ -1596,31 +2847,76 @@ class MyGame(arcade.View):
             if self.lightning_radius <= 0:
                 self.lightning_radius = 0.0
                 self.lightning_active = False
-                return
         hx = self.hero_sprite.center_x
         hy = self.hero_sprite.center_y
-        hit_set = self.lightning_hit_out if self.lightning_phase == 0 else self.lightning_hit_in
-        for enemy in list(self.enemy_list):
-            key = id(enemy)
-            if key in hit_set:
+        radius = self.lightning_radius
+        padding = self.lightning_band_padding(hx, hy)
+        self.lightning_x = hx
+        self.lightning_y = hy
+        if expanding:
+            hit_set = self.lightning_hit_out
+            inner = previous_r - padding
+            outer = radius
+        else:
+            hit_set = self.lightning_hit_in
+            inner = radius
+            outer = previous_r + padding
+        for enemy in self.enemies_in_annulus(hx, hy, inner, outer):
+            if enemy in hit_set:
                 continue
-            dist = math.hypot(enemy.center_x - hx, enemy.center_y - hy)
-            if dist <= self.lightning_radius:
-                hit_set.add(key)
-                self.damage_enemy(enemy, 60)
-                if hasattr(enemy, "apply_slow"):
-                    enemy.apply_slow(0.65, 2.5)
+            hit_set.add(enemy)
+            self.damage_enemy(enemy, 60)
+            if enemy.hp > 0:
+                self.status.apply(enemy, "slow", 2.5, 0.65)
         if self.boss_list:
             boss = self.boss_list[0]
-            key = id(boss)
-            if key not in hit_set:
+            if boss not in hit_set:
                 dist = math.hypot(boss.center_x - hx, boss.center_y - hy)
-                if dist <= self.lightning_radius:
-                    hit_set.add(key)
+                if dist <= radius:
+                    hit_set.add(boss)
                     self.damage_boss(20)
                     self.apply_slow_to_boss(0.75, 2.5)
 
+    def lightning_band_padding(self, hx, hy):
+        hero_shift = math.hypot(hx - self.lightning_x, hy - self.lightning_y)
+        enemy_step = ENEMY_MAX_SPEED * max(1, int(self.ai_lod_interval or 1))
+        return hero_shift + enemy_step + self.separation_push + LIGHTNING_BAND_MARGIN
+
     def on_update(self, delta_time):
+        self.sim_accumulator += max(0.0, float(delta_time))
+        steps = int(self.sim_accumulator / SIM_DT + 1e-6)
+        if steps > MAX_SIM_STEPS:
+            steps = MAX_SIM_STEPS
+            self.sim_accumulator = SIM_DT * steps
+        for i in range(steps):
+            if self.finished:
+                break
+            if i == steps - 1:
+                self.store_previous_positions()
+            self.step(SIM_DT)
+            self.sim_accumulator -= SIM_DT
+        self.sim_alpha = min(1.0, max(0.0, self.sim_accumulator / SIM_DT))
+        if self.autosave_path and self.time_elapsed >= self.autosave_at and not (self.game_over or self.win):
+            self.autosave_at = self.time_elapsed + SNAPSHOT_AUTOSAVE_INTERVAL
+            self.save_snapshot(self.autosave_path)
+
+    def store_previous_positions(self):
+        if not self.interpolation_layers:
+            return
+        self.previous_positions = {
+            sprite: sprite.position for layer in self.interpolation_layers for sprite in layer
+        }
+        self.previous_viewport = (self.viewport_left, self.viewport_bottom)
+
+    def step(self, delta_time):
+        tick = self.sim_tick
+        if self.replay is not None:
+            for event in self.replay.inputs_at(tick):
+                self.apply_input(event)
+            if tick >= self.replay.ticks:
+                self.close_game()
+                return
+        self.sim_tick = tick + 1
         if self.game_over or self.win:
             self.end_timer += delta_time
             if self.end_timer >= 5.0:
@@ -1628,55 +2924,42 @@ class MyGame(arcade.View):
             return
         if self.skill_selecting:
             return
+        profiler = self.profiler
+        if profiler is None:
+            for _, phase in self.update_phases:
+                if phase(delta_time):
+                    return
+            return
+        profiler.begin_frame()
+        self.collision_checks = 0
+        for name, phase in self.update_phases:
+            start = time.perf_counter()
+            stop = phase(delta_time)
+            profiler.add(name, time.perf_counter() - start)
+            if stop:
+                break
+        profiler.count("collision_checks", self.collision_checks)
+        profiler.end_frame()
 
+    def update_timers(self, delta_time):
         self.time_elapsed += delta_time
         self.shoot_timer += delta_time
 
-        self.skill2_cooldown = max(0.0, self.skill2_cooldown - delta_time)
-        self.skill4_cooldown = max(0.0, self.skill4_cooldown - delta_time)
-        self.skill5_cooldown = max(0.0, self.skill5_cooldown - delta_time)
-        self.skill6_cooldown = max(0.0, self.skill6_cooldown - delta_time)
-        self.skill7_cooldown = max(0.0, self.skill7_cooldown - delta_time)
-        self.skill8_cooldown = max(0.0, self.skill8_cooldown - delta_time)
+        self.update_skills(delta_time)
 
-        if self.skill2_timer > 0:
-            self.skill2_timer = max(0.0, self.skill2_timer - delta_time)
-        else:
-            self.skill2_tick = 0.0
-
-        if self.skill5_mode == "active":
-            if self.skill5_timer > 0:
-                self.skill5_timer = max(0.0, self.skill5_timer - delta_time)
-                self.update_aura(delta_time)
-            if self.skill5_timer <= 0:
-                self.skill5_mode = "passive"
-                self.skill5_active = False
-                self.skill5_timer = 0.0
-                self.skill5_tick = 0.0
-
-        if (5 in self.skills and self.skill5_mode == "passive" and
-                self.skill5_stacks > 0 and
-                self.time_elapsed - self.skill5_last_kill_time > 10.0):
-            self.skill5_stacks = max(0, self.skill5_stacks - 1)
-            self.update_skill5_passive_bonus()
-            self.skill5_last_kill_time = self.time_elapsed
+    def update_effects(self, delta_time):
+        self.status.tick(delta_time, self.damage_over_time)
+        return self.win
 
-        if self.skill6_timer > 0:
-            self.skill6_timer = max(0.0, self.skill6_timer - delta_time)
-        if self.skill7_timer > 0:
-            self.skill7_timer = max(0.0, self.skill7_timer - delta_time)
-
-        if self.golem_list:
-            self.golem_life_timer = max(0.0, self.golem_life_timer - delta_time)
-            if self.golem_life_timer <= 0 or self.golem_hp <= 0:
-                for s in list(self.golem_list):
-                    s.remove_from_sprite_lists()
-                self.golem_life_timer = 0.0
-                self.golem_hp = 0.0
-
-        self.update_lightning(delta_time)
-        self.hero_sprite.update_poison(delta_time)
+    def damage_over_time(self, entity, amount):
+        if self.boss_list and entity is self.boss_list[0]:
+            self.damage_boss(amount)
+        elif entity is not self.hero_sprite and self.enemy_list in entity.sprite_lists:
+            self.damage_enemy(entity, amount)
+        else:
+            self.status.apply_damage(entity, amount)
 
+    def update_hero(self, delta_time):
         self.hero_sprite.center_x += self.hero_sprite.change_x
         self.hero_sprite.center_y += self.hero_sprite.change_y
         if self.hero_sprite.center_y + self.hero_sprite.height // 2 >= MAP_HEIGHT:
@@ -1688,48 +2971,51 @@ class MyGame(arcade.View):
         if self.hero_sprite.center_x - self.hero_sprite.width // 2 <= 0:
             self.hero_sprite.center_x = self.hero_sprite.width // 2
 
+    def update_projectiles(self, delta_time):
         for bullet in list(self.bullet_list):
             bullet.center_x += bullet.change_x
             bullet.center_y += bullet.change_y
             if bullet.center_x < 0 or bullet.center_x > MAP_WIDTH or bullet.center_y < 0 or bullet.center_y > MAP_HEIGHT:
-                bullet.remove_from_sprite_lists()
+                self.sprite_pool.release(bullet)
 
+        if not self.enemy_bullet_list:
+            return
+        hero = self.hero_sprite
+        hero_reach = self.sprite_reach(hero)
+        golem = self.golem_list[0] if self.golem_list else None
+        golem_reach = self.sprite_reach(golem) if golem is not None else 0.0
         for bullet in list(self.enemy_bullet_list):
             bullet.center_x += bullet.change_x
             bullet.center_y += bullet.change_y
             if bullet.center_x < 0 or bullet.center_x > MAP_WIDTH or bullet.center_y < 0 or bullet.center_y > MAP_HEIGHT:
-                bullet.remove_from_sprite_lists()
+                self.sprite_pool.release(bullet)
                 continue
-            if self.golem_list and arcade.check_for_collision(bullet, self.golem_list[0]):
+            reach = self.sprite_reach(bullet)
+            if golem is not None and self.golem_list and self.projectile_touches(bullet, reach, golem, golem_reach):
                 self.damage_golem(getattr(bullet, "damage", 10))
-                bullet.remove_from_sprite_lists()
+                self.sprite_pool.release(bullet)
                 continue
-            if self.skill7_timer <= 0 and arcade.check_for_collision(bullet, self.hero_sprite):
+            if self.skill_timers[7] <= 0 and self.projectile_touches(bullet, reach, hero, hero_reach):
                 self.damage_player(getattr(bullet, "damage", 10), use_defence=True, can_reduce=True)
-                if hasattr(bullet, "poison_duration") and hasattr(self.hero_sprite, "apply_poison"):
-                    try:
-                        self.hero_sprite.apply_poison(
-                            getattr(bullet, "poison_duration", POISON_DURATION),
-                            getattr(bullet, "poison_damage_per_second", POISON_DAMAGE_PER_SECOND),
-                        )
-                    except Exception:
-                        pass
-                bullet.remove_from_sprite_lists()
+                for kind, duration, magnitude in bullet.status_effects:
+                    self.status.apply(hero, kind, duration, magnitude)
+                self.sprite_pool.release(bullet)
 
+    def update_enemies(self, delta_time):
         enemy_target = None
         if self.golem_list:
             enemy_target = self.golem_list[0]
-        elif self.skill7_timer <= 0:
+        elif self.skill_timers[7] <= 0:
             enemy_target = self.hero_sprite
 
+        self.enemy_target = enemy_target
+        self.move_enemies(enemy_target, delta_time)
+        self.invalidate_enemy_index()
+        if enemy_target is None:
+            return
+
         for enemy in list(self.enemy_list):
-            enemy.target = enemy_target
-            enemy.update(delta_time)
-            half_w = enemy.width // 2
-            half_h = enemy.height // 2
-            enemy.center_x = min(max(enemy.center_x, half_w), MAP_WIDTH - half_w)
-            enemy.center_y = min(max(enemy.center_y, half_h), MAP_HEIGHT - half_h)
-            if getattr(enemy, "shooting", False) and enemy_target is not None:
+            if getattr(enemy, "shooting", False) and self.can_spawn_projectile():
                 projectile = None
                 try:
                     projectile = enemy.try_shoot()
@@ -1737,44 +3023,97 @@ class MyGame(arcade.View):
                     projectile = None
                 if projectile is not None:
                     self.enemy_bullet_list.append(projectile)
-            if enemy_target is self.hero_sprite:
-                if arcade.check_for_collision(enemy, self.hero_sprite):
-                    if getattr(enemy, "hit_cooldown", 0.0) <= 0.0:
-                        self.damage_player(enemy.damage, use_defence=True, can_reduce=True)
-                        enemy.hit_cooldown = 0.6
-            elif enemy_target is not None:
-                if arcade.check_for_collision(enemy, enemy_target):
-                    if getattr(enemy, "hit_cooldown", 0.0) <= 0.0:
-                        self.damage_golem(enemy.damage)
-                        enemy.hit_cooldown = 0.6
-
-        self.prevent_collisions()
 
+        for enemy in self.enemies_touching(enemy_target):
+            if not self.status.has(enemy, "hit_cooldown"):
+                if enemy_target is self.hero_sprite:
+                    self.damage_player(enemy.damage, use_defence=True, can_reduce=True)
+                else:
+                    self.damage_golem(enemy.damage)
+                self.status.apply(enemy, "hit_cooldown", 0.6)
+
+    def resolve_bullet_hits(self, delta_time):
+        if not self.bullet_list or not (self.enemy_list or self.boss_list):
+            return
+        if len(self.bullet_list) * len(self.enemy_list) > BROADPHASE_MIN_PAIRS:
+            grid = self.enemy_index()
+            pad = self.enemy_max_reach
+            nearby = lambda x, y, radius: grid.query(x, y, radius + pad)
+        else:
+            entries = self.enemy_entries()
+            nearby = lambda x, y, radius: entries
+        boss_entry = None
+        if self.boss_list:
+            boss = self.boss_list[0]
+            boss_entry = (boss, boss.center_x, boss.center_y, self.sprite_reach(boss))
         for bullet in list(self.bullet_list):
-            hits = arcade.check_for_collision_with_list(bullet, self.enemy_list)
+            bx, by = bullet.position
+            reach = self.sprite_reach(bullet)
+            hits = []
+            for target, tx, ty, target_reach in nearby(bx, by, reach):
+                dx = tx - bx
+                dy = ty - by
+                limit = reach + target_reach
+                if dx * dx + dy * dy > limit * limit:
+                    continue
+                if target.sprite_lists and self.collides(bullet, target):
+                    hits.append(target)
+            boss_hit = False
+            if not hits and boss_entry is not None and boss_entry[0].sprite_lists:
+                boss, tx, ty, target_reach = boss_entry
+                limit = reach + target_reach
+                if (tx - bx) ** 2 + (ty - by) ** 2 <= limit * limit:
+                    boss_hit = self.collides(bullet, boss)
             if hits:
-                bullet.remove_from_sprite_lists()
+                self.sprite_pool.release(bullet)
                 for enemy in hits:
                     self.damage_enemy(enemy, int(getattr(bullet, "damage", int(self.damage))))
-
-        for bullet in list(self.bullet_list):
-            hits = arcade.check_for_collision_with_list(bullet, self.boss_list)
-            if hits:
-                bullet.remove_from_sprite_lists()
+            elif boss_hit:
+                self.sprite_pool.release(bullet)
                 self.damage_boss(int(getattr(bullet, "damage", int(self.damage))))
                 if self.win:
-                    return
+                    return True
 
-        collected = arcade.check_for_collision_with_list(self.hero_sprite, self.exp_list)
-        if collected:
-            for orb in collected:
+    def collect_orbs(self, delta_time):
+        if not self.exp_list:
+            return
+        hx, hy = self.hero_sprite.position
+        radius = self.orb_magnet_radius
+        size = ORB_MERGE_CELL
+        cells = self.orb_cells
+        for cx in range(int((hx - radius) // size), int((hx + radius) // size) + 1):
+            for cy in range(int((hy - radius) // size), int((hy + radius) // size) + 1):
+                orb = cells.get((cx, cy))
+                if orb is None:
+                    continue
+                if (orb.center_x - hx) ** 2 + (orb.center_y - hy) ** 2 <= radius * radius:
+                    del cells[(cx, cy)]
+                    orb.orb_cell = None
+                    orb.magnet = True
+                    self.magnet_orbs.append(orb)
+        if not self.magnet_orbs:
+            return
+        moving = []
+        for orb in self.magnet_orbs:
+            if not orb.magnet or not orb.sprite_lists:
+                continue
+            dx = hx - orb.center_x
+            dy = hy - orb.center_y
+            dist = math.hypot(dx, dy)
+            if dist <= ORB_PICKUP_RADIUS + ORB_MAGNET_SPEED:
                 self.gain_exp(int(getattr(orb, "value", 0)))
-                orb.remove_from_sprite_lists()
+                self.release_orb(orb)
+                continue
+            orb.center_x += dx / dist * ORB_MAGNET_SPEED
+            orb.center_y += dy / dist * ORB_MAGNET_SPEED
+            moving.append(orb)
+        self.magnet_orbs = moving
 
+    def update_boss(self, delta_time):
         if self.boss_list:
             boss = self.boss_list[0]
-            boss_target = enemy_target
-            if boss_target is None and self.skill7_timer <= 0:
+            boss_target = self.enemy_target
+            if boss_target is None and self.skill_timers[7] <= 0:
                 boss_target = self.hero_sprite
             boss.target = boss_target
             boss.update(delta_time)
@@ -1782,7 +3121,7 @@ class MyGame(arcade.View):
             half_h = boss.height // 2
             boss.center_x = min(max(boss.center_x, half_w), MAP_WIDTH - half_w)
             boss.center_y = min(max(boss.center_y, half_h), MAP_HEIGHT - half_h)
-            if getattr(boss, "shooting", False) and boss_target is not None:
+            if getattr(boss, "shooting", False) and boss_target is not None and self.can_spawn_projectile():
                 projectile = None
                 try:
                     projectile = boss.try_shoot()
@@ -1791,31 +3130,29 @@ class MyGame(arcade.View):
                 if projectile is not None:
                     self.enemy_bullet_list.append(projectile)
             if boss_target is self.hero_sprite:
-                if arcade.check_for_collision(boss, self.hero_sprite):
-                    if getattr(boss, "hit_cooldown", 0.0) <= 0.0:
+                if self.collides(boss, self.hero_sprite):
+                    if not self.status.has(boss, "hit_cooldown"):
                         self.damage_player(getattr(boss, "damage", 25), use_defence=True, can_reduce=True)
-                        boss.hit_cooldown = 0.8
+                        self.status.apply(boss, "hit_cooldown", 0.8)
             elif boss_target is not None:
-                if arcade.check_for_collision(boss, boss_target):
-                    if getattr(boss, "hit_cooldown", 0.0) <= 0.0:
+                if self.collides(boss, boss_target):
+                    if not self.status.has(boss, "hit_cooldown"):
                         self.damage_golem(getattr(boss, "damage", 25))
-                        boss.hit_cooldown = 0.8
+                        self.status.apply(boss, "hit_cooldown", 0.8)
 
+    def update_progress(self, delta_time):
         if self.hero_sprite.hp <= 0:
-            if 1 in self.skills and not self.skill1_used:
-                self.skill1_used = True
+            if 1 in self.skills and self.skill_cooldowns[1] <= 0:
+                self.skill_cooldowns[1] = SKILLS[1].cooldown
                 self.hero_sprite.hp = max(1.0, float(self.hero_sprite.max_hp) * 0.5)
-                try:
-                    self.hero_sprite.is_poisoned = False
-                except Exception:
-                    pass
+                self.status.clear(self.hero_sprite)
             else:
                 self.hero_sprite.hp = 0.0
                 self.game_over = True
                 self.end_timer = 0.0
-                return
+                return True
 
-        if not self.boss_list and not self.enemy_list:
+        if not self.boss_list and not self.enemy_list and not self.spawn_queue:
             self.wave += 1
             if self.wave == 50 and not self.boss2_spawned:
                 self.spawn_boss2()
@@ -1826,77 +3163,307 @@ class MyGame(arcade.View):
 
         self.update_camera()
 
+    def lod_anchors(self):
+        anchors = [self.hero_sprite.position]
+        if self.golem_list:
+            anchors.append(self.golem_list[0].position)
+        return anchors
+
+    def lod_steps(self, enemy, anchors):
+        radius = self.ai_lod_distance
+        interval = self.ai_lod_interval
+        if not radius or interval <= 1:
+            return 1
+        x, y = enemy.position
+        radius_sq = float(radius) * float(radius)
+        near = any((x - ax) ** 2 + (y - ay) ** 2 <= radius_sq for ax, ay in anchors)
+        pending = int(getattr(enemy, "lod_pending", 0)) + 1
+        if near or (self.lod_tick + int(getattr(enemy, "lod_slot", 0) or 0)) % interval == 0:
+            enemy.lod_pending = 0
+            return pending
+        enemy.lod_pending = pending
+        return 0
+
+    def move_enemies(self, enemy_target, delta_time):
+        self.lod_tick += 1
+        if not self.enemy_list:
+            return
+        anchors = self.lod_anchors()
+        arrays = self.enemy_arrays if self.vectorized_enemies else None
+        if arrays is None:
+            for enemy in list(self.enemy_list):
+                steps = self.lod_steps(enemy, anchors)
+                if not steps:
+                    continue
+                enemy.target = enemy_target
+                enemy.tick_timers(delta_time * steps)
+                enemy.seek_target(steps)
+                half_w = enemy.width // 2
+                half_h = enemy.height // 2
+                enemy.center_x = min(max(enemy.center_x, half_w), MAP_WIDTH - half_w)
+                enemy.center_y = min(max(enemy.center_y, half_h), MAP_HEIGHT - half_h)
+            return
+        arrays.sync(self.enemy_list)
+        x, y = arrays.positions()
+        steps = arrays.schedule(x, y, anchors, self.ai_lod_distance, self.lod_tick, self.ai_lod_interval)
+        members = arrays.members
+        active = np.flatnonzero(steps)
+        for i, n in zip(active.tolist(), steps[active].tolist()):
+            enemy = members[i]
+            enemy.target = enemy_target
+            enemy.tick_timers(delta_time * n)
+        arrays.step(enemy_target, x, y, steps)
+
+    def wave_size(self, wave):
+        return min(20 + wave * 4, 120)
+
     def spawn_wave(self, wave):
-        count = min(20 + wave * 4, 120)
-        for _ in range(count):
-            self.spawn_enemy()
+        count = self.wave_size(wave)
+        reserve = self.spawn_reserve
+        if reserve and reserve[0].spawn_level != wave:
+            reserve.clear()
+        ready = reserve[:count]
+        del reserve[:count]
+        self.spawn_queue.extend(ready)
+        self.spawn_queue.extend([None] * (count - len(ready)))
+        self.spawn_points = collections.deque(self.sample_spawn_points(len(self.spawn_queue)))
+
+    def spawn_exclusion(self):
+        return self.spawn_extent * SPAWN_EXCLUSION
+
+    def spawn_arcs(self, radius, left, bottom, right, top):
+        hx = self.hero_sprite.center_x
+        hy = self.hero_sprite.center_y
+        cuts = [0.0, 2 * math.pi]
+        for edge in (left, right):
+            c = (edge - hx) / radius
+            if -1.0 <= c <= 1.0:
+                a = math.acos(c)
+                cuts += [a, 2 * math.pi - a]
+        for edge in (bottom, top):
+            c = (edge - hy) / radius
+            if -1.0 <= c <= 1.0:
+                a = math.asin(c) % (2 * math.pi)
+                cuts += [a, (math.pi - a) % (2 * math.pi)]
+        cuts.sort()
+        arcs = []
+        for a0, a1 in zip(cuts, cuts[1:]):
+            if a1 <= a0:
+                continue
+            mid = (a0 + a1) / 2
+            x = hx + radius * math.cos(mid)
+            y = hy + radius * math.sin(mid)
+            if left <= x <= right and bottom <= y <= top:
+                if arcs and arcs[-1][1] == a0:
+                    arcs[-1] = (arcs[-1][0], a1)
+                else:
+                    arcs.append((a0, a1))
+        return arcs
 
-    def spawn_enemy(self):
-        min_dist = max(self.view_width, self.view_height) * 1.2
+    def sample_spawn_points(self, count):
+        if count <= 0:
+            return []
+        radius = self.spawn_exclusion()
+        hx = self.hero_sprite.center_x
+        hy = self.hero_sprite.center_y
+        left = SPAWN_MARGIN
+        bottom = SPAWN_MARGIN
+        right = MAP_WIDTH - SPAWN_MARGIN
+        top = MAP_HEIGHT - SPAWN_MARGIN
+        ring = self.spawn_arcs(radius, left, bottom, right, top) if radius > 0 else [(0.0, 2 * math.pi)]
+        arcs = ring or [(0.0, 2 * math.pi)]
+        if not ring:
+            hx = (left + right) / 2
+            hy = (bottom + top) / 2
+        total = sum(a1 - a0 for a0, a1 in arcs)
+        slice_width = total / count
+        start = self.rng.uniform(0.0, total)
+        offsets = [0.0]
+        for a0, a1 in arcs:
+            offsets.append(offsets[-1] + a1 - a0)
+        if np is not None:
+            gen = np.random.default_rng(self.rng.getrandbits(64))
+            along = (start + (np.arange(count) + gen.random(count)) * slice_width) % total
+            index = np.minimum(np.searchsorted(offsets, along, side="right") - 1, len(arcs) - 1)
+            angle = np.array([a0 for a0, _ in arcs])[index] + along - np.array(offsets)[index]
+            dx = np.cos(angle)
+            dy = np.sin(angle)
+            with np.errstate(divide="ignore"):
+                reach_x = np.where(dx > 0, (right - hx) / dx, np.where(dx < 0, (left - hx) / dx, np.inf))
+                reach_y = np.where(dy > 0, (top - hy) / dy, np.where(dy < 0, (bottom - hy) / dy, np.inf))
+            reach = np.minimum(reach_x, reach_y)
+            if ring:
+                reach = np.maximum(reach, radius)
+                dist = np.sqrt(radius * radius + gen.random(count) * (reach * reach - radius * radius))
+            else:
+                dist = reach
+            xs = np.clip(hx + dx * dist, left, right)
+            ys = np.clip(hy + dy * dist, bottom, top)
+            return list(zip(xs.tolist(), ys.tolist()))
+        points = []
+        for i in range(count):
+            along = (start + (i + self.rng.random()) * slice_width) % total
+            arc = min(bisect.bisect_right(offsets, along) - 1, len(arcs) - 1)
+            angle = arcs[arc][0] + along - offsets[arc]
+            dx = math.cos(angle)
+            dy = math.sin(angle)
+            reach = math.inf
+            if dx:
+                reach = min(reach, ((right if dx > 0 else left) - hx) / dx)
+            if dy:
+                reach = min(reach, ((top if dy > 0 else bottom) - hy) / dy)
+            dist = reach
+            if ring:
+                reach = max(reach, radius)
+                dist = math.sqrt(radius * radius + self.rng.random() * (reach * reach - radius * radius))
+            points.append((min(max(hx + dx * dist, left), right), min(max(hy + dy * dist, bottom), top)))
+        return points
+
+    def next_spawn_point(self):
+        radius = self.spawn_exclusion()
         hx = self.hero_sprite.center_x
         hy = self.hero_sprite.center_y
-        x = 0
-        y = 0
-        for _ in range(50):
-            x = random.randint(60, MAP_WIDTH - 60)
-            y = random.randint(60, MAP_HEIGHT - 60)
-            if (x - hx) ** 2 + (y - hy) ** 2 >= min_dist ** 2:
+        points = self.spawn_points
+        while points:
+            x, y = points.popleft()
+            if (x - hx) ** 2 + (y - hy) ** 2 >= radius * radius:
+                return x, y
+        points.extend(self.sample_spawn_points(len(self.spawn_queue) + 1))
+        return points.popleft()
+
+    def spawn_allowance(self):
+        return range(max(1, int(self.spawn_per_tick)))
+
+    def update_spawns(self, delta_time):
+        queue = self.spawn_queue
+        if not queue:
+            self.prewarm_spawns()
+            return
+        for _ in self.spawn_allowance():
+            if not queue:
+                break
+            enemy = queue.popleft()
+            if enemy is None:
+                enemy = self.make_enemy(int(getattr(self, "wave", 1) or 1))
+            self.place_enemy(enemy)
+
+    def flush_spawns(self):
+        while self.spawn_queue:
+            enemy = self.spawn_queue.popleft()
+            if enemy is None:
+                enemy = self.make_enemy(int(getattr(self, "wave", 1) or 1))
+            self.place_enemy(enemy)
+
+    def prewarm_spawns(self):
+        if not self.spawn_prewarm:
+            return
+        level = int(getattr(self, "wave", 1) or 1) + 1
+        if level in (50, 100):
+            return
+        reserve = self.spawn_reserve
+        if reserve and reserve[0].spawn_level != level:
+            reserve.clear()
+        count = self.wave_size(level)
+        for _ in self.spawn_allowance():
+            if len(reserve) >= count:
                 break
-        r = random.random()
-        w = int(getattr(self, "wave", 1) or 1)
+            reserve.append(self.make_enemy(level))
+
+    def make_enemy(self, w):
+        r = self.rng.random()
         if w < 3:
-            enemy = EnemiesPudge(x, y, self.hero_sprite, w)
+            enemy = EnemiesPudge(0, 0, self.hero_sprite, w, rng=self.rng)
         elif w < 6:
             if r < 0.7:
-                enemy = EnemiesPudge(x, y, self.hero_sprite, w)
+                enemy = EnemiesPudge(0, 0, self.hero_sprite, w, rng=self.rng)
             else:
-                enemy = FireArchers(x, y, self.hero_sprite, w)
+                enemy = FireArchers(0, 0, self.hero_sprite, w, rng=self.rng)
         else:
             if r < 0.6:
-                enemy = EnemiesPudge(x, y, self.hero_sprite, w)
+                enemy = EnemiesPudge(0, 0, self.hero_sprite, w, rng=self.rng)
             elif r < 0.85:
-                enemy = FireArchers(x, y, self.hero_sprite, w)
+                enemy = FireArchers(0, 0, self.hero_sprite, w, rng=self.rng)
             else:
-                enemy = WitchDoktor(x, y, self.hero_sprite, w)
+                enemy = WitchDoktor(0, 0, self.hero_sprite, w, rng=self.rng)
+        enemy.spawn_level = w
+        return enemy
+
+    def spawn_enemy(self):
+        return self.place_enemy(self.make_enemy(int(getattr(self, "wave", 1) or 1)))
+
+    def place_enemy(self, enemy):
+        x, y = self.next_spawn_point()
+        enemy.center_x = x
+        enemy.center_y = y
+        enemy.target = self.hero_sprite
+        enemy.projectile_pool = self.sprite_pool
+        enemy.lod_slot = self.enemies_spawned
+        self.enemies_spawned += 1
         self.enemy_list.append(enemy)
+        self.invalidate_enemy_index()
+        return enemy
 
     def spawn_exp_orb(self, x, y, value):
-        orb = make_solid_sprite(16, 16, arcade.color.LIME_GREEN)
+        cell = (int(x // ORB_MERGE_CELL), int(y // ORB_MERGE_CELL))
+        orb = self.orb_cells.get(cell)
+        if orb is not None and orb.sprite_lists:
+            orb.value = int(getattr(orb, "value", 0)) + value
+            return orb
+        orb = self.new_orb(x, y, value, cell)
+        if len(self.exp_list) > self.max_exp_orbs:
+            self.merge_oldest_orbs()
+        return orb
+
+    def new_orb(self, x, y, value, cell):
+        orb = self.sprite_pool.take("exp_orb")
+        if orb is None:
+            orb = make_solid_sprite(16, 16, arcade.color.LIME_GREEN)
+            orb.pool_kind = "exp_orb"
         orb.center_x = x
         orb.center_y = y
         orb.value = value
+        orb.orb_cell = cell
+        orb.magnet = False
+        if cell is not None:
+            self.orb_cells[cell] = orb
         self.exp_list.append(orb)
+        return orb
+
+    def release_orb(self, orb):
+        cell = getattr(orb, "orb_cell", None)
+        if cell is not None and self.orb_cells.get(cell) is orb:
+            del self.orb_cells[cell]
+        orb.orb_cell = None
+        orb.magnet = False
+        self.sprite_pool.release(orb)
+
+    def merge_oldest_orbs(self):
+        while len(self.exp_list) > max(1, self.max_exp_orbs):
+            oldest = self.exp_list[0]
+            survivor = self.exp_list[1]
+            survivor.value = int(getattr(survivor, "value", 0)) + int(getattr(oldest, "value", 0))
+            self.release_orb(oldest)
+
+    def can_spawn_projectile(self):
+        return len(self.bullet_list) + len(self.enemy_bullet_list) < self.max_projectiles
 
     def spawn_bullet(self, x, y, target_x, target_y, damage):
-        bullet = make_sprite_from_candidates(
-            [f"{ASSET_DIR}/bull.png", "bull.png"],
-            scale=0.12,
-            fallback_w=10,
-            fallback_h=10,
-            fallback_color=arcade.color.GOLD,
-        )
-        bullet.center_x = x
-        bullet.center_y = y
-        dx = target_x - x
-        dy = target_y - y
-        dist = math.hypot(dx, dy)
-        if dist == 0:
-            dist = 1
-        speed = 14
-        bullet.change_x = (dx / dist) * speed
-        bullet.change_y = (dy / dist) * speed
-        try:
-            bullet.angle = math.degrees(math.atan2(dy, dx))
-        except Exception:
-            pass
+        if not self.can_spawn_projectile():
+            return
+        bullet = self.sprite_pool.spawn(HeroBullet, x, y, target_x, target_y)
         final_damage = float(damage)
-        if 3 in self.skills and random.random() < 0.35:
+        if 3 in self.skills and self.rng.random() < 0.35:
             final_damage = final_damage * 1.35
         bullet.damage = int(final_damage)
         self.bullet_list.append(bullet)
 
     def spawn_enemy_bullet(self, x, y, target_x, target_y, damage):
-        bullet = make_solid_sprite(12, 12, arcade.color.BLUE)
+        if not self.can_spawn_projectile():
+            return
+        bullet = self.sprite_pool.take("enemy_bullet")
+        if bullet is None:
+            bullet = make_solid_sprite(12, 12, arcade.color.BLUE)
+            bullet.pool_kind = "enemy_bullet"
         bullet.center_x = x
         bullet.center_y = y
         dx = target_x - x
@@ -1924,6 +3491,508 @@ class MyGame(arcade.View):
                 self.skill_selecting = True
                 break
 
+    def apply_skill(self, idx):
+        self.skill_cooldowns[idx] = 0.0
+        self.skill_timers[idx] = 0.0
+
+    def spawn_boss1(self):
+        x = self.rng.randint(400, MAP_WIDTH - 400)
+        y = self.rng.randint(400, MAP_HEIGHT - 400)
+        boss = BossDragon(x, y, self.hero_sprite, int(self.wave))
+        boss.projectile_pool = self.sprite_pool
+        boss.is_final_boss = True
+        self.boss_list.append(boss)
+        self.boss1_spawned = True
+
+    def spawn_boss2(self):
+        x = self.rng.randint(400, MAP_WIDTH - 400)
+        y = self.rng.randint(400, MAP_HEIGHT - 400)
+        boss = OrkBoss(x, y, self.hero_sprite, int(self.wave))
+        boss.projectile_pool = self.sprite_pool
+        boss.is_final_boss = False
+        self.boss_list.append(boss)
+        self.boss2_spawned = True
+
+    def update_camera(self, force=False):
+        target_x = self.hero_sprite.center_x - self.view_width / 2
+        target_y = self.hero_sprite.center_y - self.view_height / 2
+
+        max_x = max(0, MAP_WIDTH - self.view_width)
+        max_y = max(0, MAP_HEIGHT - self.view_height)
+        target_x = min(max(target_x, 0), max_x)
+        target_y = min(max(target_y, 0), max_y)
+
+        if force:
+            self.viewport_left = float(target_x)
+            self.viewport_bottom = float(target_y)
+            self.previous_viewport = None
+        else:
+            self.viewport_left += (target_x - self.viewport_left) * CAMERA_LERP
+            self.viewport_bottom += (target_y - self.viewport_bottom) * CAMERA_LERP
+
+    def close_game(self):
+        self.finished = True
+
+    def run(self, ticks, delta_time=SIM_DT):
+        done = 0
+        while done < ticks and not self.finished:
+            self.step(delta_time)
+            done += 1
+        return done
+
+
+class MyGame(GameSimulation, arcade.View):
+    def __init__(self, selected_hero=0, seed=None, replay=None, snapshot=None):
+        arcade.View.__init__(self)
+        if replay is not None:
+            GameSimulation.__init__(self, replay.selected_hero, replay.view_width, replay.view_height, replay.seed)
+        elif snapshot is not None:
+            GameSimulation.__init__(self, snapshot.selected_hero, snapshot.view_width, snapshot.view_height,
+                                    snapshot.seed)
+            self.restore_snapshot(snapshot)
+        else:
+            GameSimulation.__init__(self, selected_hero, self.window.width, self.window.height, seed=seed)
+        self.map = load_asset_texture("map")
+        self.world_layers = (
+            self.exp_list,
+            self.enemy_list,
+            self.golem_list,
+            self.enemy_bullet_list,
+            self.bullet_list,
+            self.boss_list,
+            self.sprite_list,
+        )
+        self.world_layer_names = ("exp", "enemies", "golem", "enemy_bullets", "bullets", "boss", "hero")
+        self.interpolation_layers = (
+            self.golem_list,
+            self.boss_list,
+            self.sprite_list,
+        )
+        self.interpolate_rendering = True
+        self.world_camera = None
+        self.gui_camera = None
+        self.hud_text = TextCache()
+        self.skill_icons = IconLayer()
+        self.skill_pick_icons = IconLayer()
+        self.end_text = TextCache()
+        self.draw_profiler = None
+        self.profiler_text = TextCache()
+        self.profiler_lines = []
+        self.profiler_refresh_at = 0.0
+        self.profiler_log_at = 0.0
+        self.skill_textures = {}
+        self.skill_buttons = []
+        self.skill_hud_buttons = []
+        self.close_hooked = False
+        self.record_replays = replay is None and snapshot is None
+        if replay is not None:
+            self.play_replay(replay)
+        else:
+            self.autosave_path = SNAPSHOT_AUTOSAVE
+        if self.record_replays:
+            self.start_recording()
+
+    def on_show_view(self):
+        if self.window:
+            self.view_width = self.window.width
+            self.view_height = self.window.height
+            self.ensure_cameras()
+            self.world_camera.match_window()
+            self.gui_camera.match_window()
+            self.update_camera(force=True)
+            self.send_input(("view", self.view_width, self.view_height))
+            if not self.close_hooked:
+                self.window.push_handlers(on_close=self.on_window_close)
+                self.close_hooked = True
+
+    def on_hide_view(self):
+        self.save_recording()
+
+    def load_snapshot(self, path):
+        try:
+            if self.snapshot_future is not None:
+                self.snapshot_future.result()
+            snapshot = Snapshot.load(path)
+        except Exception:
+            return None
+        game_view = MyGame(snapshot=snapshot)
+        self.window.show_view(game_view)
+        return game_view
+
+    def on_window_close(self):
+        self.save_recording()
+
+    def save_recording(self):
+        if self.recording is None:
+            return None
+        path = os.path.join(REPLAY_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.seed}.rep")
+        try:
+            self.stop_recording(path)
+        except Exception:
+            return None
+        prune_replays()
+        return path
+
+    def on_resize(self, width, height):
+        super().on_resize(width, height)
+        self.view_width = width
+        self.view_height = height
+        if self.world_camera is not None:
+            self.world_camera.match_window()
+            self.gui_camera.match_window()
+        self.update_camera(force=True)
+        self.send_input(("view", width, height))
+
+    def on_draw(self):
+        profiler = self.draw_profiler
+        if profiler is not None:
+            profiler.begin_frame()
+        self.clear()
+        restore = self.apply_interpolation() if self.interpolate_rendering else None
+        try:
+            self.draw_world(profiler)
+        finally:
+            if restore:
+                self.restore_positions(restore)
+        self.gui_camera.use()
+        if profiler is None:
+            self.draw_hud()
+        else:
+            start = time.perf_counter()
+            self.draw_hud()
+            profiler.add("draw_hud", time.perf_counter() - start)
+        if self.skill_selecting:
+            self.draw_skill_select()
+        if self.game_over:
+            self.draw_end_screen("GAME OVER")
+        if self.win:
+            self.draw_end_screen("WIN")
+        if profiler is not None:
+            profiler.end_frame()
+            self.draw_profiler_overlay()
+
+    def apply_interpolation(self):
+        alpha = self.sim_alpha
+        restore = []
+        if alpha >= 1.0:
+            return restore
+        previous = self.previous_positions
+        snap = INTERPOLATION_SNAP_DISTANCE
+        for layer in self.interpolation_layers:
+            for sprite in layer:
+                prev = previous.get(sprite)
+                if prev is None:
+                    continue
+                x, y = sprite.position
+                px, py = prev
+                if px == x and py == y:
+                    continue
+                if abs(x - px) > snap or abs(y - py) > snap:
+                    continue
+                restore.append((sprite, x, y))
+                sprite.position = (px + (x - px) * alpha, py + (y - py) * alpha)
+        return restore
+
+    def restore_positions(self, restore):
+        for sprite, x, y in restore:
+            sprite.position = (x, y)
+
+    def render_viewport(self):
+        left = self.viewport_left
+        bottom = self.viewport_bottom
+        if not self.interpolate_rendering or self.previous_viewport is None or self.sim_alpha >= 1.0:
+            return left, bottom
+        alpha = self.sim_alpha
+        px, py = self.previous_viewport
+        return px + (left - px) * alpha, py + (bottom - py) * alpha
+
+    def ensure_cameras(self):
+        if self.world_camera is None:
+            self.world_camera = arcade.Camera2D()
+            self.gui_camera = arcade.Camera2D()
+
+    def draw_world(self, profiler=None):
+        self.ensure_cameras()
+        left, bottom = self.render_viewport()
+        self.world_camera.position = (left + self.view_width / 2, bottom + self.view_height / 2)
+        self.world_camera.use()
+        start = time.perf_counter() if profiler is not None else 0.0
+        if self.map is not None:
+            rect = arcade.rect.XYWH(MAP_WIDTH // 2, MAP_HEIGHT // 2, MAP_WIDTH, MAP_HEIGHT)
+            arcade.draw_texture_rect(self.map, rect)
+        else:
+            arcade.draw_lbwh_rectangle_filled(0, 0, MAP_WIDTH, MAP_HEIGHT, arcade.color.DARK_GRAY)
+        if profiler is None:
+            self.draw_world_layers()
+            self.draw_world_effects()
+            return
+        profiler.add("draw_map", time.perf_counter() - start)
+        self.draw_world_layers(profiler)
+        start = time.perf_counter()
+        self.draw_world_effects()
+        profiler.add("draw_effects", time.perf_counter() - start)
+
+    def draw_world_layers(self, profiler=None):
+        if profiler is None:
+            for spritelist in self.world_layers:
+                if spritelist:
+                    spritelist.draw()
+            return
+        for name, spritelist in zip(self.world_layer_names, self.world_layers):
+            start = time.perf_counter()
+            if spritelist:
+                spritelist.draw()
+            profiler.add("draw_" + name, time.perf_counter() - start)
+
+    def toggle_profiler(self):
+        if self.profiler is None:
+            self.profiler = FrameProfiler(PROFILER_HISTORY)
+            self.draw_profiler = FrameProfiler(PROFILER_HISTORY)
+            self.profiler_lines = []
+            self.profiler_refresh_at = 0.0
+            self.profiler_log_at = time.perf_counter() + PROFILER_LOG_INTERVAL
+        else:
+            self.profiler = None
+            self.draw_profiler = None
+
+    def profiler_report(self):
+        lines = []
+        for title, profiler in (("update", self.profiler), ("draw", self.draw_profiler)):
+            if profiler is None or not profiler.frames:
+                continue
+            summary = profiler.summary()
+            total = summary.pop("total")
+            lines.append(f"{title}: {total['mean_ms']:.2f} ms  p95 {total['p95_ms']:.2f}  max {total['max_ms']:.2f}")
+            for name, stats in summary.items():
+                lines.append(f"  {name}: {stats['mean_ms']:.3f}  p95 {stats['p95_ms']:.3f}")
+        counts = " ".join(f"{name}={len(layer)}" for name, layer in zip(self.world_layer_names, self.world_layers))
+        lines.append(f"sprites: {counts}")
+        checks = self.profiler.counts.get("collision_checks", 0) if self.profiler is not None else 0
+        lines.append(f"collision checks/tick: {checks}")
+        return lines
+
+    def draw_profiler_overlay(self):
+        now = time.perf_counter()
+        if now >= self.profiler_refresh_at:
+            self.profiler_refresh_at = now + PROFILER_REFRESH_INTERVAL
+            self.profiler_lines = self.profiler_report()
+            if now >= self.profiler_log_at:
+                self.profiler_log_at = now + PROFILER_LOG_INTERVAL
+                print(" | ".join(line.strip() for line in self.profiler_lines), flush=True)
+        lines = self.profiler_lines
+        line_height = 15
+        width = 360
+        left = self.view_width - width - 10
+        top = self.view_height - 10
+        height = line_height * len(lines) + 10
+        arcade.draw_lbwh_rectangle_filled(left, top - height, width, height, (0, 0, 0, 170))
+        texts = self.profiler_text
+        texts.begin()
+        for i, line in enumerate(lines):
+            texts.text(i, line, left + 6, top - 6 - (i + 1) * line_height, arcade.color.WHITE, 10)
+        texts.end()
+        texts.draw()
+
+    def draw_world_effects(self):
+        hx = self.hero_sprite.center_x
+        hy = self.hero_sprite.center_y
+        if self.lightning_active:
+            arcade.draw_circle_outline(hx, hy, self.lightning_radius, arcade.color.YELLOW, 3)
+        if self.skill_timers[5] > 0:
+            arcade.draw_circle_outline(hx, hy, 220, arcade.color.PURPLE, 3)
+
+        if self.skill_timers[7] > 0:
+            arcade.draw_circle_outline(hx, hy, 80, arcade.color.GRAY, 2)
+
+    def draw_hud(self):
+        texts = self.hud_text
+        texts.begin()
+        bar_width = 220
+        bar_height = 18
+        hp_max = float(self.hero_sprite.max_hp) if self.hero_sprite else 0.0
+        hp = float(self.hero_sprite.hp) if self.hero_sprite else 0.0
+        hp_ratio = hp / hp_max if hp_max else 0
+        exp_ratio = self.exp / self.exp_max if self.exp_max else 0
+
+        hp_x = 20
+        hp_y = self.view_height - 40
+        exp_x = 20
+        exp_y = self.view_height - 70
+
+        arcade.draw_lbwh_rectangle_outline(
+            hp_x, hp_y, bar_width, bar_height, arcade.color.BLACK
+        )
+        arcade.draw_lbwh_rectangle_filled(
+            hp_x, hp_y, int(bar_width * hp_ratio), bar_height, arcade.color.RED
+        )
+        texts.text(
+            "hp",
+            f"HP: {int(hp)}/{int(hp_max)}",
+            hp_x + bar_width + 10,
+            hp_y + 2,
+            arcade.color.BLACK,
+            12,
+        )
+
+        arcade.draw_lbwh_rectangle_outline(
+            exp_x, exp_y, bar_width, bar_height, arcade.color.BLACK
+        )
+        arcade.draw_lbwh_rectangle_filled(
+            exp_x, exp_y, int(bar_width * exp_ratio), bar_height, arcade.color.BLUE
+        )
+        texts.text(
+            "exp",
+            f"EXP: {int(self.exp)}/{int(self.exp_max)}",
+            exp_x + bar_width + 10,
+            exp_y + 2,
+            arcade.color.BLACK,
+            12,
+        )
+
+        minutes = int(self.time_elapsed) // 60
+        seconds = int(self.time_elapsed) % 60
+        texts.text(
+            "time",
+            f"Время: {minutes:02d}:{seconds:02d}",
+            self.view_width - 180,
+            self.view_height - 40,
+            arcade.color.BLACK,
+            14,
+        )
+        texts.text(
+            "wave",
+            f"Волна: {self.wave}",
+            self.view_width - 180,
+            self.view_height - 70,
+            arcade.color.BLACK,
+            14,
+        )
+        texts.text(
+            "level",
+            f"LVL: {self.level}",
+            20,
+            self.view_height - 100,
+            arcade.color.BLACK,
+            14,
+        )
+        texts.text(
+            "damage",
+            f"DMG: {int(self.damage)}",
+            20,
+            self.view_height - 120,
+            arcade.color.BLACK,
+            14,
+        )
+        texts.text(
+            "kills",
+            f"KILLS: {self.mobs_killed}",
+            20,
+            self.view_height - 140,
+            arcade.color.BLACK,
+            14,
+        )
+        if self.boss_list:
+            boss = self.boss_list[0]
+            boss_hp = getattr(boss, "hp", 0)
+            boss_hp_max = getattr(boss, "max_hp", getattr(boss, "hp_max", boss_hp))
+            ratio = boss_hp / boss_hp_max if boss_hp_max else 0
+            w = 360
+            h = 16
+            x = self.view_width // 2 - w // 2
+            y = self.view_height - 30
+            arcade.draw_lbwh_rectangle_outline(x, y, w, h, arcade.color.BLACK)
+            arcade.draw_lbwh_rectangle_filled(x, y, int(w * ratio), h, arcade.color.BLUE)
+            texts.text(
+                "boss",
+                f"BOSS: {int(boss_hp)}/{int(boss_hp_max)}",
+                x + w // 2,
+                y + h // 2,
+                arcade.color.WHITE,
+                12,
+                anchor_x="center",
+                anchor_y="center",
+            )
+        self.draw_skills_bar()
+        texts.end()
+        texts.draw()
+
+    def skill_texture(self, skill_id):
+        if skill_id not in self.skill_textures:
+            self.skill_textures[skill_id] = load_asset_texture(f"skill:{skill_id}")
+        return self.skill_textures[skill_id]
+
+    def draw_skills_bar(self):
+        if not self.skills:
+            return
+        texts = self.hud_text
+        icon = 44
+        gap = 10
+        skills_sorted = sorted(self.skills)
+        total_w = len(skills_sorted) * icon + (len(skills_sorted) - 1) * gap
+        x = self.view_width - total_w - 20
+        y = 20
+        self.skill_hud_buttons = []
+        cooldowns = self.skill_cooldowns
+        entries = []
+        for i, skill_id in enumerate(skills_sorted):
+            tex = self.skill_texture(skill_id)
+            if tex is not None:
+                entries.append((tex, x + i * (icon + gap) + icon // 2, y + icon // 2, icon))
+        self.skill_icons.draw(entries)
+        for skill_id in skills_sorted:
+            self.skill_hud_buttons.append((skill_id, x, y, icon, icon))
+            tex = self.skill_texture(skill_id)
+            if tex is None:
+                arcade.draw_lbwh_rectangle_filled(x, y, icon, icon, arcade.color.LIGHT_GRAY)
+                arcade.draw_lbwh_rectangle_outline(x, y, icon, icon, arcade.color.BLACK)
+                texts.text((skill_id, "icon"), str(skill_id), x + icon // 2, y + icon // 2, arcade.color.BLACK, 18,
+                           anchor_x="center", anchor_y="center", bold=True)
+            arcade.draw_lbwh_rectangle_outline(x, y, icon, icon, arcade.color.BLACK)
+            texts.text((skill_id, "key"), str(skill_id), x + 6, y + 4, arcade.color.BLACK, 12, bold=True)
+
+            cd = cooldowns[skill_id]
+            spec = SKILLS.get(skill_id)
+            for tag, label, slot in (spec.badges(self) if spec is not None else ()):
+                if slot == "corner":
+                    texts.text((skill_id, tag), label, x + icon - 8, y + icon - 8, arcade.color.BLACK, 10,
+                               anchor_x="center", anchor_y="center", bold=True)
+                else:
+                    label_y = y + icon + 4 if slot == "top" else y - 14
+                    texts.text((skill_id, tag), label, x + icon // 2, label_y, arcade.color.BLACK, 10,
+                               anchor_x="center", bold=True)
+            if cd > 0 and cd < 900:
+                texts.text((skill_id, "cd"), f"CD {cd:.0f}", x + icon // 2, y + icon + 4, arcade.color.BLACK, 10,
+                           anchor_x="center", bold=True)
+            if cd >= 900:
+                texts.text((skill_id, "used"), "USED", x + icon // 2, y + icon + 4, arcade.color.BLACK, 10,
+                           anchor_x="center", bold=True)
+            x += icon + gap
+
+    def on_key_press(self, key, modifiers):
+        if key == arcade.key.F3:
+            self.toggle_profiler()
+            return
+        if key == arcade.key.F5 and self.replay is None and not (self.game_over or self.win):
+            self.save_snapshot(SNAPSHOT_QUICKSAVE)
+            return
+        if key == arcade.key.F9 and self.replay is None:
+            self.load_snapshot(SNAPSHOT_QUICKSAVE)
+            return
+        if self.game_over or self.win:
+            if key in (arcade.key.ESCAPE, arcade.key.ENTER):
+                self.close_game()
+            return
+        if self.skill_selecting:
+            return
+        self.send_input(("key", key, True))
+
+    def on_key_release(self, key, modifiers):
+        if self.game_over or self.win:
+            return
+        if self.skill_selecting:
+            return
+        self.send_input(("key", key, False))
+
     def draw_skill_select(self):
         w = min(820, self.view_width - 60)
         h = 400
@@ -1949,6 +4018,16 @@ class MyGame(arcade.View):
         start_x = self.view_width // 2 - grid_w // 2
         start_y = bottom + 80 + (grid_h - size)
         self.skill_buttons = []
+        entries = []
+        for r in range(rows):
+            for c in range(cols):
+                skill_id = r * cols + c + 1
+                tex = self.skill_texture(skill_id)
+                if tex is not None and skill_id not in self.skills:
+                    x = start_x + c * (size + gap)
+                    y = start_y - r * (size + gap)
+                    entries.append((tex, x + size // 2, y + size // 2, size))
+        self.skill_pick_icons.draw(entries)
         for r in range(rows):
             for c in range(cols):
                 skill_id = r * cols + c + 1
@@ -1961,10 +4040,7 @@ class MyGame(arcade.View):
                     arcade.draw_text("✓", x + size // 2, y + size // 2, arcade.color.WHITE, 28,
                                      anchor_x="center", anchor_y="center", bold=True)
                     continue
-                tex = self.skill_textures[skill_id - 1] if (skill_id - 1) < len(self.skill_textures) else None
-                if tex is not None:
-                    rct = arcade.rect.XYWH(x + size // 2, y + size // 2, size, size)
-                    arcade.draw_texture_rect(tex, rct)
+                if self.skill_texture(skill_id) is not None:
                     arcade.draw_lbwh_rectangle_outline(x, y, size, size, arcade.color.BLACK)
                 else:
                     arcade.draw_lbwh_rectangle_filled(x, y, size, size, arcade.color.LIGHT_GRAY)
@@ -1980,10 +4056,6 @@ class MyGame(arcade.View):
             anchor_x="center",
         )
 
-    def apply_skill(self, idx):
-        if idx == 1:
-            self.skill1_used = False
-
     def on_mouse_press(self, x, y, button, modifiers):
         if self.game_over or self.win:
             return
@@ -1992,51 +4064,15 @@ class MyGame(arcade.View):
                 return
             for idx, bx, by, bw, bh in self.skill_buttons:
                 if bx <= x <= bx + bw and by <= y <= by + bh:
-                    if idx in self.skills:
-                        return
-                    if len(self.skills) >= MAX_SKILLS:
-                        return
-                    self.skills.append(idx)
-                    self.apply_skill(idx)
-                    self.skill_selecting = False
-                    self.gain_exp(0)
+                    self.send_input(("choose", idx))
                     return
             return
         if button == arcade.MOUSE_BUTTON_LEFT and self.skill_hud_buttons:
             for skill_id, bx, by, bw, bh in self.skill_hud_buttons:
                 if bx <= x <= bx + bw and by <= y <= by + bh:
-                    self.activate_skill(skill_id)
+                    self.send_input(("skill", skill_id))
                     return
-        if self.golem_armed and button == arcade.MOUSE_BUTTON_LEFT:
-            self.try_summon_golem(x, y)
-            return
-        if button == arcade.MOUSE_BUTTON_RIGHT:
-            self.try_summon_golem(x, y)
-            return
-        if button != arcade.MOUSE_BUTTON_LEFT:
-            return
-        if self.shoot_timer < self.shot_cooldown:
-            return
-        self.shoot_timer = 0.0
-        world_x = x + self.viewport_left
-        world_y = y + self.viewport_bottom
-        self.spawn_bullet(self.hero_sprite.center_x, self.hero_sprite.center_y, world_x, world_y, self.damage)
-
-    def spawn_boss1(self):
-        x = random.randint(400, MAP_WIDTH - 400)
-        y = random.randint(400, MAP_HEIGHT - 400)
-        boss = BossDragon(x, y, self.hero_sprite, int(self.wave))
-        boss.is_final_boss = True
-        self.boss_list.append(boss)
-        self.boss1_spawned = True
-
-    def spawn_boss2(self):
-        x = random.randint(400, MAP_WIDTH - 400)
-        y = random.randint(400, MAP_HEIGHT - 400)
-        boss = OrkBoss(x, y, self.hero_sprite, int(self.wave))
-        boss.is_final_boss = False
-        self.boss_list.append(boss)
-        self.boss2_spawned = True
+        self.send_input(("click", button, x + self.viewport_left, y + self.viewport_bottom))
 
     def draw_end_screen(self, title):
         w = min(720, self.view_width - 80)
@@ -2045,7 +4081,10 @@ class MyGame(arcade.View):
         bottom = self.view_height // 2 - h // 2
         arcade.draw_lbwh_rectangle_filled(left, bottom, w, h, (0, 0, 0, 210))
         arcade.draw_lbwh_rectangle_outline(left, bottom, w, h, arcade.color.WHITE)
-        arcade.draw_text(
+        texts = self.end_text
+        texts.begin()
+        texts.text(
+            "title",
             title,
             self.view_width // 2,
             bottom + h - 70,
@@ -2056,7 +4095,8 @@ class MyGame(arcade.View):
         )
         minutes = int(self.time_elapsed) // 60
         seconds = int(self.time_elapsed) % 60
-        arcade.draw_text(
+        texts.text(
+            "stats",
             f"LVL: {self.level}  |  Волна: {self.wave}  |  Время: {minutes:02d}:{seconds:02d}",
             self.view_width // 2,
             bottom + 140,
@@ -2065,7 +4105,8 @@ class MyGame(arcade.View):
             anchor_x="center",
             bold=True,
         )
-        arcade.draw_text(
+        texts.text(
+            "hero",
             f"HP: {int(self.hero_sprite.max_hp)}  |  DMG: {int(self.damage)}  |  DEF: {int(self.defence)}",
             self.view_width // 2,
             bottom + 105,
@@ -2074,7 +4115,8 @@ class MyGame(arcade.View):
             anchor_x="center",
             bold=True,
         )
-        arcade.draw_text(
+        texts.text(
+            "kills",
             f"Убито мобов: {self.mobs_killed}  |  Скиллы: {len(self.skills)}/{MAX_SKILLS}",
             self.view_width // 2,
             bottom + 70,
@@ -2083,7 +4125,8 @@ class MyGame(arcade.View):
             anchor_x="center",
             bold=True,
         )
-        arcade.draw_text(
+        texts.text(
+            "exit",
             "ESC/ENTER - выйти",
             self.view_width // 2,
             bottom + 30,
@@ -2091,8 +4134,12 @@ class MyGame(arcade.View):
             14,
             anchor_x="center",
         )
+        texts.end()
+        texts.draw()
 
     def close_game(self):
+        self.finished = True
+        self.save_recording()
         window = self.window if self.window else None
         if window and hasattr(window, "close"):
             window.close()
@@ -2103,24 +4150,13 @@ class MyGame(arcade.View):
         if hasattr(arcade, "exit"):
             arcade.exit()
 
-    def update_camera(self, force=False):
-        target_x = self.hero_sprite.center_x - self.view_width / 2
-        target_y = self.hero_sprite.center_y - self.view_height / 2
-
-        max_x = max(0, MAP_WIDTH - self.view_width)
-        max_y = max(0, MAP_HEIGHT - self.view_height)
-        target_x = min(max(target_x, 0), max_x)
-        target_y = min(max(target_y, 0), max_y)
-
-        if force:
-            self.viewport_left = float(target_x)
-            self.viewport_bottom = float(target_y)
-        else:
-            self.viewport_left += (target_x - self.viewport_left) * CAMERA_LERP
-            self.viewport_bottom += (target_y - self.viewport_bottom) * CAMERA_LERP
-
 
 def main():
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument("--replay", help="play back a recorded .rep file instead of starting a new game")
+    parser.add_argument("--seed", type=int, help="seed for a new game")
+    parser.add_argument("--load", help="resume a saved .snap game state")
+    args = parser.parse_args()
     try:
         window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, fullscreen=True)
     except Exception:
@@ -2129,8 +4165,12 @@ def main():
             window.set_fullscreen(True)
         except Exception:
             pass
-    start_view = Start_menu()
-    window.show_view(start_view)
+    if args.replay:
+        window.show_view(MyGame(replay=Replay.load(args.replay)))
+    elif args.load:
+        window.show_view(MyGame(snapshot=Snapshot.load(args.load)))
+    else:
+        window.show_view(Start_menu(seed=args.seed))
     arcade.run()
 
 
@@ -0,0 +1,501 @@
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+
+import arcade
+
+import Project
+
+
+def make_window():
+    try:
+        return arcade.Window(Project.SCREEN_WIDTH, Project.SCREEN_HEIGHT, "bench", visible=False)
+    except TypeError:
+        return arcade.Window(Project.SCREEN_WIDTH, Project.SCREEN_HEIGHT, "bench")
+
+
+def make_game():
+    game = Project.MyGame(selected_hero=0)
+    game.stop_recording()
+    game.autosave_path = None
+    return game
+
+
+def fill_enemies(game, count, seed=1):
+    rng = random.Random(seed)
+    game.enemy_list.clear()
+    kinds = (Project.EnemiesPudge, Project.FireArchers, Project.WitchDoktor)
+    for i in range(count):
+        x = rng.uniform(60, Project.MAP_WIDTH - 60)
+        y = rng.uniform(60, Project.MAP_HEIGHT - 60)
+        enemy = kinds[i % len(kinds)](x, y, game.hero_sprite, game.wave)
+        enemy.lod_slot = i
+        game.enemy_list.append(enemy)
+    game.invalidate_enemy_index()
+
+
+def pairwise_collisions(game):
+    entities = list(game.enemy_list) + list(game.boss_list) + list(game.golem_list) + [game.hero_sprite]
+    for i in range(len(entities)):
+        e1 = entities[i]
+        r1 = game.body_radius(e1)
+        for j in range(i + 1, len(entities)):
+            e2 = entities[j]
+            r2 = game.body_radius(e2)
+            dx = e2.center_x - e1.center_x
+            dy = e2.center_y - e1.center_y
+            dist = math.hypot(dx, dy)
+            min_sep = r1 + r2 + 4.0
+            if dist < min_sep and dist > 0:
+                overlap = min_sep - dist
+                move_x = (dx / dist) * overlap * 0.5
+                move_y = (dy / dist) * overlap * 0.5
+                e1.center_x -= move_x
+                e1.center_y -= move_y
+                e2.center_x += move_x
+                e2.center_y += move_y
+                game.keep_in_bounds(e1)
+                game.keep_in_bounds(e2)
+
+
+def time_ticks(func, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        func()
+    return (time.perf_counter() - start) / ticks * 1000.0
+
+
+def bench_collisions(counts=(120, 250, 500, 1000, 2000), ticks=30):
+    game = make_game()
+    print(f"{'entities':>9} {'grid ms':>10} {'pairwise ms':>12}")
+    for count in counts:
+        fill_enemies(game, count)
+        grid_ms = time_ticks(game.prevent_collisions, ticks)
+        fill_enemies(game, count)
+        pair_ms = time_ticks(lambda: pairwise_collisions(game), max(1, ticks // 10)) if count <= 1000 else float("nan")
+        print(f"{count:>9} {grid_ms:>10.3f} {pair_ms:>12.3f}")
+
+
+def bench_enemies(counts=(120, 500, 1000, 2000), ticks=60):
+    game = make_game()
+    modes = ((False, None), (True, None), (False, Project.AI_LOD_DISTANCE), (True, Project.AI_LOD_DISTANCE))
+    print(f"{'enemies':>8} {'per-sprite ms':>14} {'numpy ms':>9} {'per-sprite+lod':>15} {'numpy+lod':>10}")
+    for count in counts:
+        timings = []
+        for vectorized, lod_distance in modes:
+            if vectorized and game.enemy_arrays is None:
+                timings.append(float("nan"))
+                continue
+            fill_enemies(game, count)
+            game.vectorized_enemies = vectorized
+            game.ai_lod_distance = lod_distance
+            timings.append(time_ticks(lambda: game.move_enemies(game.hero_sprite, 1 / 60), ticks))
+        print(f"{count:>8} {timings[0]:>14.3f} {timings[1]:>9.3f} {timings[2]:>15.3f} {timings[3]:>10.3f}")
+
+
+def bench_spawn(count=2000):
+    game = make_game()
+    game.max_projectiles = count * 2
+    hero = game.hero_sprite
+    factories = (
+        ("hero bullet", lambda: game.spawn_bullet(hero.center_x, hero.center_y, 0, 0, game.damage)),
+        ("FireArrow", lambda: Project.FireArrow(0, 0, 100, 100)),
+        ("IceBall", lambda: Project.IceBall(0, 0, 100, 100)),
+        ("WitchDoktorBullet", lambda: Project.WitchDoktorBullet(0, 0, 100, 100)),
+        ("OrkBossBullet", lambda: Project.OrkBossBullet(0, 0, 100, 100)),
+        ("EnemiesPudge", lambda: Project.EnemiesPudge(0, 0, hero, 1)),
+        ("WitchDoktor", lambda: Project.WitchDoktor(0, 0, hero, 1)),
+    )
+    print(f"{'factory':>18} {'us/instance':>12}")
+    for name, factory in factories:
+        factory()
+        us = time_ticks(factory, count) * 1000.0
+        game.bullet_list.clear()
+        print(f"{name:>18} {us:>12.2f}")
+    pool = game.sprite_pool
+
+    def pooled_arrow():
+        pool.release(pool.spawn(Project.FireArrow, 0, 0, 100, 100))
+
+    pooled_arrow()
+    us = time_ticks(pooled_arrow, count) * 1000.0
+    print(f"{'pooled FireArrow':>18} {us:>12.2f}")
+    print(pool.stats())
+
+
+def fill_world(game, enemies=120, bullets=200, orbs=400, seed=2):
+    rng = random.Random(seed)
+    fill_enemies(game, enemies, seed)
+    hero = game.hero_sprite
+    game.max_projectiles = bullets * 4
+    for _ in range(bullets):
+        game.spawn_bullet(hero.center_x, hero.center_y, rng.uniform(0, Project.MAP_WIDTH), rng.uniform(0, Project.MAP_HEIGHT), 10)
+        enemy = game.enemy_list[rng.randrange(len(game.enemy_list))]
+        game.enemy_bullet_list.append(Project.FireArrow(enemy.center_x, enemy.center_y, hero.center_x, hero.center_y))
+    for _ in range(orbs):
+        game.spawn_exp_orb(rng.uniform(0, Project.MAP_WIDTH), rng.uniform(0, Project.MAP_HEIGHT), 5)
+
+
+def legacy_draw_world(game):
+    offset_x = -game.viewport_left
+    offset_y = -game.viewport_bottom
+    game.window.default_camera.use()
+    for spritelist in game.world_layers:
+        if not spritelist:
+            continue
+        for sprite in spritelist:
+            sprite.center_x += offset_x
+            sprite.center_y += offset_y
+        spritelist.draw()
+        for sprite in spritelist:
+            sprite.center_x -= offset_x
+            sprite.center_y -= offset_y
+
+
+def bench_draw(frames=120):
+    game = make_game()
+    game.window.show_view(game)
+    fill_world(game)
+    total = sum(len(layer) for layer in game.world_layers)
+    ctx = game.window.ctx
+
+    def camera_frame():
+        game.world_camera.use()
+        game.draw_world_layers()
+        ctx.finish()
+
+    def legacy_frame():
+        legacy_draw_world(game)
+        ctx.finish()
+
+    game.draw_world()
+    legacy_frame()
+    print(f"world sprites: {total} (sprite layers only, map and HUD excluded)")
+    print(f"{'camera ms':>10} {'offset ms':>10}")
+    print(f"{time_ticks(camera_frame, frames):>10.3f} {time_ticks(legacy_frame, frames):>10.3f}")
+
+
+def reset_asset_caches():
+    Project.TEXTURE_CACHE.clear()
+    Project.SPRITE_PROTOTYPES.clear()
+    Project.ASSET_INDEX = None
+
+
+def bench_startup(runs=5):
+    window = arcade.get_window()
+    ctx = window.ctx
+    rows = []
+    for _ in range(runs):
+        reset_asset_caches()
+        start = time.perf_counter()
+        menu = Project.Start_menu()
+        window.show_view(menu)
+        menu.on_draw()
+        ctx.finish()
+        menu_ms = (time.perf_counter() - start) * 1000
+        while not menu.loader.is_done():
+            menu.on_update(1 / 60)
+            time.sleep(0.001)
+        preload_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        game = make_game()
+        window.show_view(game)
+        game.on_draw()
+        ctx.finish()
+        game_ms = (time.perf_counter() - start) * 1000
+        reset_asset_caches()
+        start = time.perf_counter()
+        game = make_game()
+        window.show_view(game)
+        game.on_draw()
+        ctx.finish()
+        cold_ms = (time.perf_counter() - start) * 1000
+        rows.append((menu_ms, preload_ms, game_ms, cold_ms))
+    rows = sorted(zip(*rows))
+    menu_ms, preload_ms, game_ms, cold_ms = (values[len(values) // 2] for values in rows)
+    print(f"assets found: {len([name for name in Project.ASSET_MANIFEST if Project.resolve_asset(name)])}"
+          f"/{len(Project.ASSET_MANIFEST)} (median of {runs} runs)")
+    print(f"{'menu ms':>10} {'preload ms':>11} {'game ms':>10} {'cold ms':>10}")
+    print(f"{menu_ms:>10.1f} {preload_ms:>11.1f} {game_ms:>10.1f} {cold_ms:>10.1f}")
+
+
+def bench_headless(ticks=3000, seed=1):
+    game = Project.GameSimulation(0, Project.SCREEN_WIDTH, Project.SCREEN_HEIGHT, seed=seed)
+    hero = game.hero_sprite
+    hero.max_hp = hero.hp = 1e9
+    start = time.perf_counter()
+    for tick in range(ticks):
+        game.set_movement(left=(tick // 120) % 2 == 0, right=(tick // 120) % 2 == 1)
+        game.fire_at(hero.center_x + 200, hero.center_y + 50)
+        if game.skill_selecting:
+            game.choose_skill(len(game.skills) + 2)
+        game.run(1)
+    elapsed = time.perf_counter() - start
+    print(f"{ticks} ticks in {elapsed:.2f} s -> {ticks / elapsed:.0f} ticks/s (wave {game.wave}, kills {game.mobs_killed})")
+
+
+def bench_replay(path, top=10):
+    replay = Project.Replay.load(path)
+    game = Project.GameSimulation(replay.selected_hero, replay.view_width, replay.view_height, seed=replay.seed)
+    game.play_replay(replay)
+    game.profiler = Project.FrameProfiler(history=replay.ticks)
+    frame_ticks = []
+    start = time.perf_counter()
+    while game.sim_tick < replay.ticks and not game.finished:
+        recorded = len(game.profiler.frames)
+        game.step(Project.SIM_DT)
+        if len(game.profiler.frames) > recorded:
+            frame_ticks.append(game.sim_tick - 1)
+    elapsed = time.perf_counter() - start
+    print(f"{path}: seed {replay.seed}, {game.sim_tick} ticks in {elapsed:.2f} s -> "
+          f"{game.sim_tick / max(elapsed, 1e-9):.0f} ticks/s (wave {game.wave}, kills {game.mobs_killed})")
+    print_slowest_ticks(game.profiler.frames, frame_ticks, top)
+    return game
+
+
+def print_slowest_ticks(frames, frame_ticks, top):
+    slowest = sorted(range(len(frames)), key=lambda i: frames[i]["total"], reverse=True)[:top]
+    for i in slowest:
+        phases = sorted(((name, ms) for name, ms in frames[i].items() if name != "total"), key=lambda item: -item[1])
+        breakdown = "  ".join(f"{name} {ms * 1000:.2f}" for name, ms in phases[:4])
+        print(f"  tick {frame_ticks[i]:>7}  {frames[i]['total'] * 1000:7.2f} ms  {breakdown}")
+
+
+def make_snapshot(path, wave, seed=1234):
+    game = scenario_game(wave, seed)
+    game.save_snapshot(path).result()
+    print(f"{path}: wave {wave}, {len(game.enemy_list)} enemies")
+
+
+def bench_snapshot(path, ticks=600, top=10):
+    game = Project.GameSimulation.from_snapshot(Project.Snapshot.load(path))
+    game.profiler = Project.FrameProfiler(history=ticks)
+    frame_ticks = []
+    start = time.perf_counter()
+    for tick in range(ticks):
+        if game.finished:
+            break
+        hero_fire_driver(game, tick)
+        recorded = len(game.profiler.frames)
+        game.step(Project.SIM_DT)
+        if len(game.profiler.frames) > recorded:
+            frame_ticks.append(tick)
+    elapsed = time.perf_counter() - start
+    print(f"{path}: {len(frame_ticks)} ticks in {elapsed:.2f} s -> "
+          f"{len(frame_ticks) / max(elapsed, 1e-9):.0f} ticks/s (wave {game.wave}, kills {game.mobs_killed})")
+    print_slowest_ticks(game.profiler.frames, frame_ticks, top)
+    return game
+
+
+def scenario_game(wave, seed, spread=1400.0):
+    random.seed(seed)
+    game = Project.GameSimulation(0, Project.SCREEN_WIDTH, Project.SCREEN_HEIGHT, seed=seed)
+    hero = game.hero_sprite
+    hero.max_hp = hero.hp = 1e12
+    game.wave = wave
+    game.enemy_list.clear()
+    game.spawn_queue.clear()
+    if wave not in (50, 100):
+        game.spawn_wave(wave)
+        game.flush_spawns()
+    for enemy in game.enemy_list:
+        enemy.center_x = hero.center_x + random.uniform(-spread, spread)
+        enemy.center_y = hero.center_y + random.uniform(-spread, spread)
+    game.invalidate_enemy_index()
+    return game
+
+
+def hero_fire_driver(game, tick):
+    hero = game.hero_sprite
+    angle = tick * 0.37
+    game.fire_at(hero.center_x + math.cos(angle) * 400, hero.center_y + math.sin(angle) * 400)
+    if game.skill_selecting:
+        game.choose_skill(len(game.skills) + 2)
+
+
+def scenario_wave1_pudges(seed):
+    return scenario_game(1, seed), hero_fire_driver
+
+
+def scenario_wave25_cap(seed):
+    return scenario_game(25, seed), hero_fire_driver
+
+
+def scenario_orkboss_spam(seed):
+    game = scenario_game(50, seed)
+    game.spawn_boss2()
+    hero = game.hero_sprite
+    boss = game.boss_list[0]
+    boss.center_x = hero.center_x + 180
+    boss.center_y = hero.center_y
+    game.shot_cooldown = 0.0
+
+    def driver(game, tick):
+        hero_fire_driver(game, tick)
+        boss.attack_cooldown = 0.0
+
+    return game, driver
+
+
+def scenario_lightning_aura_horde(seed):
+    game = scenario_game(25, seed, spread=900.0)
+    game.skills = [4, 5]
+
+    def driver(game, tick):
+        hero_fire_driver(game, tick)
+        game.skill_cooldowns[4] = 0.0
+        game.activate_skill(4)
+        if game.skill_timers[5] <= 0:
+            game.skill_cooldowns[5] = 0.0
+            game.activate_skill(5)
+
+    return game, driver
+
+
+def scenario_golem_out(seed):
+    game = scenario_game(25, seed)
+    game.skills = [8]
+    hero = game.hero_sprite
+    game.try_summon_golem(hero.center_x + 300, hero.center_y)
+
+    def driver(game, tick):
+        hero_fire_driver(game, tick)
+        game.golem_hp = 500.0
+        game.skill_timers[8] = 60.0
+
+    return game, driver
+
+
+SCENARIOS = {
+    "wave1_pudges": scenario_wave1_pudges,
+    "wave25_cap": scenario_wave25_cap,
+    "orkboss_spam": scenario_orkboss_spam,
+    "lightning_aura_horde": scenario_lightning_aura_horde,
+    "golem_out": scenario_golem_out,
+}
+
+
+def run_scenario(name, ticks=600, warmup=60, seed=1234):
+    game, driver = SCENARIOS[name](seed)
+    for tick in range(warmup):
+        driver(game, tick)
+        game.step(Project.SIM_DT)
+    game.profiler = Project.FrameProfiler(history=ticks)
+    for tick in range(warmup, warmup + ticks):
+        driver(game, tick)
+        game.step(Project.SIM_DT)
+    return {
+        "ticks": len(game.profiler.frames),
+        "enemies": len(game.enemy_list),
+        "enemy_projectiles": len(game.enemy_bullet_list),
+        "phases": game.profiler.summary(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare_results(current, baseline, threshold=0.10):
+    regressions = []
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        for key in ("mean_ms", "p95_ms", "p99_ms"):
+            new_value = result["phases"]["total"][key]
+            old_value = old["phases"]["total"][key]
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            flag = "  REGRESSION" if change > threshold else ""
+            print(f"{name:>22} {key:>8} {old_value:>9.3f} -> {new_value:>9.3f} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append((name, key))
+    return regressions
+
+
+def bench_scenarios(names=None, ticks=600, seed=1234, out="bench_results.json", baseline=None):
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": Project.np is not None,
+        "seed": seed,
+        "scenarios": {},
+    }
+    for name in names or list(SCENARIOS):
+        result = run_scenario(name, ticks=ticks, seed=seed)
+        results["scenarios"][name] = result
+        total = result["phases"]["total"]
+        print(f"{name:>22} mean {total['mean_ms']:7.3f} ms  p95 {total['p95_ms']:7.3f}  p99 {total['p99_ms']:7.3f}")
+        for phase, stats in result["phases"].items():
+            if phase != "total":
+                print(f"{'':>24}{phase:>12} mean {stats['mean_ms']:7.3f}  p95 {stats['p95_ms']:7.3f}  p99 {stats['p99_ms']:7.3f}")
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {out}")
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            regressions = compare_results(results, json.load(f))
+        if regressions:
+            raise SystemExit(1)
+    return results
+
+
+BENCHES = {
+    "collisions": bench_collisions,
+    "enemies": bench_enemies,
+    "spawn": bench_spawn,
+    "draw": bench_draw,
+    "headless": bench_headless,
+    "startup": bench_startup,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PyArcade game benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run: scenarios, {', '.join(BENCHES)}")
+    parser.add_argument("--scenario", action="append", help=f"scenario to run: {', '.join(SCENARIOS)}")
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", default="bench_results.json", help="machine-readable scenario results")
+    parser.add_argument("--compare", help="previous results file; exit 1 if total tick time regressed by >10%%")
+    parser.add_argument("--replay", help="replay file: run it headless at full speed and list the slowest ticks")
+    parser.add_argument("--snapshot", help="snapshot file: resume it headless for --ticks and list the slowest ticks")
+    parser.add_argument("--make-snapshot", type=int, metavar="WAVE",
+                        help="write a snapshot of a scenario game at WAVE to the --snapshot file")
+    args = parser.parse_args()
+    if args.replay:
+        bench_replay(args.replay)
+        return
+    if args.snapshot:
+        if args.make_snapshot is not None:
+            make_snapshot(args.snapshot, args.make_snapshot, args.seed)
+        bench_snapshot(args.snapshot, args.ticks)
+        return
+    names = args.names or ["scenarios"] + list(BENCHES)
+    if names == ["scenarios"]:
+        bench_scenarios(args.scenario, args.ticks, args.seed, args.out, args.compare)
+        return
+    window = make_window()
+    for name in names:
+        if name == "scenarios":
+            print(f"== {name}")
+            bench_scenarios(args.scenario, args.ticks, args.seed, args.out, args.compare)
+            continue
+        if name not in BENCHES:
+            print(f"unknown benchmark: {name}; available: scenarios, {', '.join(BENCHES)}")
+            continue
+        print(f"== {name}")
+        BENCHES[name]()
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import Project
+
+
+def test_lightning_hits_enemies_the_hero_walks_into():
+    game = Project.GameSimulation(0, 800, 500, seed=1)
+    hero = game.hero_sprite
+    hero.max_hp = hero.hp = 1e12
+    game.enemy_list.clear()
+    game.spawn_queue.clear()
+    line = []
+    for i in range(40):
+        enemy = Project.EnemiesPudge(hero.center_x + 60 + i * 9.0, hero.center_y, hero, 1)
+        enemy.hp = enemy.max_hp = 1e9
+        enemy.base_speed = 3.2
+        game.enemy_list.append(enemy)
+        line.append(enemy)
+    game.invalidate_enemy_index()
+    game.skills.append(4)
+    game.activate_skill(4)
+    game.set_movement(right=True)
+    while game.lightning_phase == 0 and game.lightning_active:
+        game.step(Project.SIM_DT)
+    radius = game.lightning_radius
+    missed = [
+        enemy for enemy in line
+        if enemy.sprite_lists and enemy not in game.lightning_hit_out
+        and (enemy.center_x - hero.center_x) ** 2 + (enemy.center_y - hero.center_y) ** 2 <= radius * radius
+    ]
+    assert game.lightning_hit_out
+    assert not missed
+
+
+def test_lightning_skips_enemies_outside_the_swept_band():
+    game = Project.GameSimulation(0, 800, 500, seed=1)
+    hero = game.hero_sprite
+    game.enemy_list.clear()
+    game.spawn_queue.clear()
+    game.skills.append(4)
+    game.activate_skill(4)
+    for _ in range(30):
+        game.step(Project.SIM_DT)
+    inside = []
+    for i in range(12):
+        enemy = Project.EnemiesPudge(hero.center_x + 40 + i * 5.0, hero.center_y - 40, hero, 1)
+        enemy.hp = enemy.max_hp = 1e9
+        game.enemy_list.append(enemy)
+        inside.append(enemy)
+    game.invalidate_enemy_index()
+    grid = game.enemy_index()
+    query_ring = grid.query_ring
+    visited = []
+
+    def recording_query_ring(x, y, inner, outer):
+        found = query_ring(x, y, inner, outer)
+        visited.extend(entry[0] for entry in found)
+        return found
+
+    grid.query_ring = recording_query_ring
+    game.step(Project.SIM_DT)
+    assert game.lightning_phase == 0 and game.lightning_radius > 200
+    assert not any(enemy in visited for enemy in inside)
+    assert all(enemy.hp == enemy.max_hp for enemy in inside)
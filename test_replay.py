@@ -0,0 +1,40 @@
+import Project
+
+
+def run_state(game, ticks):
+    hero = game.hero_sprite
+    hero.max_hp = hero.hp = 1e12
+    game.set_movement(right=True, up=True)
+    for tick in range(ticks):
+        if tick % 7 == 0:
+            game.fire_at(hero.center_x + 300, hero.center_y + (tick % 50) * 4 - 100)
+        if game.skill_selecting:
+            game.choose_skill(len(game.skills) + 2)
+        game.step(Project.SIM_DT)
+    enemies = [(type(e).__name__, round(e.center_x, 6), round(e.center_y, 6), e.hp) for e in game.enemy_list]
+    return (game.sim_tick, game.wave, game.mobs_killed, game.exp, hero.position, enemies,
+            len(game.spawn_queue), len(game.spawn_reserve), game.rng.getstate())
+
+
+def test_seed_alone_determines_the_run():
+    first = run_state(Project.GameSimulation(0, 1280, 720, seed=42), 1500)
+    second = run_state(Project.GameSimulation(0, 1280, 720, seed=42), 1500)
+    assert first[5]
+    assert first == second
+
+
+def test_replay_reproduces_a_recorded_run():
+    game = Project.GameSimulation(0, 1280, 720, seed=7)
+    game.start_recording()
+    game.send_input(("key", Project.arcade.key.D, True))
+    game.run(300)
+    game.send_input(("click", Project.arcade.MOUSE_BUTTON_LEFT, 100.0, 100.0))
+    game.run(300)
+    replay = Project.Replay.from_bytes(game.stop_recording().to_bytes())
+    again = Project.GameSimulation(replay.selected_hero, replay.view_width, replay.view_height, replay.seed)
+    again.play_replay(replay)
+    while again.sim_tick < replay.ticks and not again.finished:
+        again.step(Project.SIM_DT)
+    assert again.hero_sprite.position == game.hero_sprite.position
+    assert [e.position for e in again.enemy_list] == [e.position for e in game.enemy_list]
+    assert again.rng.getstate() == game.rng.getstate()
@@ -0,0 +1,28 @@
+import Project
+
+
+def orb_state(game):
+    return [(orb.position, orb.value, orb.orb_cell, orb.magnet) for orb in game.exp_list]
+
+
+def test_snapshot_round_trip_keeps_magnet_orbs_out_of_cells():
+    game = Project.GameSimulation(0, 800, 500, seed=3)
+    game.run(120)
+    for orb in list(game.exp_list):
+        game.release_orb(orb)
+    resting = game.spawn_exp_orb(10.0, 10.0, 5)
+    pulled = game.spawn_exp_orb(200.0, 200.0, 7)
+    game.release_orb(pulled)
+    pulled = game.new_orb(20.0, 20.0, 7, None)
+    pulled.magnet = True
+    game.magnet_orbs.append(pulled)
+    snapshot = Project.Snapshot.from_bytes(game.capture_snapshot().to_bytes())
+    again = Project.GameSimulation.from_snapshot(snapshot)
+    assert orb_state(again) == orb_state(game)
+    assert len(again.exp_list) == 2
+    assert again.orb_cells == {resting.orb_cell: again.exp_list[0]}
+    assert again.magnet_orbs == [again.exp_list[1]]
+    again.hero_sprite.position = (15.0, 15.0)
+    again.collect_orbs(Project.SIM_DT)
+    assert len(again.magnet_orbs) <= 2
+    assert len(set(map(id, again.magnet_orbs))) == len(again.magnet_orbs)
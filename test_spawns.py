@@ -0,0 +1,28 @@
+import math
+
+import Project
+
+
+def map_bounds():
+    margin = Project.SPAWN_MARGIN
+    return margin, margin, Project.MAP_WIDTH - margin, Project.MAP_HEIGHT - margin
+
+
+def test_spawn_points_fill_the_annulus_inside_the_map():
+    game = Project.GameSimulation(0, 1280, 720, seed=5)
+    left, bottom, right, top = map_bounds()
+    radius = game.spawn_exclusion()
+    for hx, hy in ((2500.0, 2500.0), (30.0, 30.0), (Project.MAP_WIDTH - 10.0, 200.0)):
+        game.hero_sprite.position = (hx, hy)
+        points = game.sample_spawn_points(120)
+        assert len(points) == 120
+        for x, y in points:
+            assert left <= x <= right and bottom <= y <= top
+            assert math.hypot(x - hx, y - hy) >= radius - 1e-6
+
+
+def test_spawn_fallback_spreads_points_along_the_map_edge():
+    game = Project.GameSimulation(0, 1280, 720, seed=5)
+    game.spawn_extent = Project.MAP_WIDTH * 10
+    points = game.sample_spawn_points(12)
+    assert len(set(points)) == 12
@@ -0,0 +1,32 @@
+import Project
+
+
+def test_lethal_poison_kills_through_the_kill_path():
+    game = Project.GameSimulation(0, 800, 500, seed=2)
+    hero = game.hero_sprite
+    game.enemy_list.clear()
+    game.spawn_queue.clear()
+    for orb in list(game.exp_list):
+        game.release_orb(orb)
+    enemy = Project.EnemiesPudge(hero.center_x + 300, hero.center_y, hero, 1)
+    enemy.hp = 1.0
+    game.enemy_list.append(enemy)
+    game.invalidate_enemy_index()
+    game.status.apply(enemy, "poison", 3.0, 5.0)
+    killed = game.mobs_killed
+    for _ in range(int(Project.POISON_TICK_INTERVAL / Project.SIM_DT) + 2):
+        game.update_effects(Project.SIM_DT)
+    assert not enemy.sprite_lists
+    assert game.mobs_killed == killed + 1
+    assert len(game.exp_list) == 1
+    assert game.status.active_count() == 0
+
+
+def test_poison_without_a_sim_only_clamps_hp():
+    status = Project.StatusEffects()
+    hero = Project.arcade.SpriteSolidColor(10, 10, color=Project.arcade.color.RED)
+    hero.hp = 1.0
+    status.apply(hero, "poison", 3.0, 5.0)
+    status.tick(Project.POISON_TICK_INTERVAL + 0.01)
+    assert hero.hp == 0.0
+    assert not status.has(hero, "poison")